@@ -0,0 +1,146 @@
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Short replies whose meaning depends entirely on the previous bot message
+FOLLOW_UP_REPLIES = {
+    'yes', 'yeah', 'yup', 'sure', 'ok', 'okay', 'please', 'no', 'nope', 'thanks', 'thank you',
+    'hi', 'hello', 'હા', 'ના', 'ઓકે', 'આભાર'
+}
+
+
+def normalize_question(text):
+    """Lower-case, drop punctuation/emoji and collapse whitespace (Gujarati letters are kept)"""
+    text = text.lower()
+    text = re.sub(r'[^\w\s\u0A80-\u0AFF]', ' ', text)
+    return ' '.join(text.split())
+
+
+def is_cacheable_question(normalized):
+    """Follow-up replies like 'yes' are answered from chat history, so never share them"""
+    return len(normalized) >= 3 and normalized not in FOLLOW_UP_REPLIES
+
+
+def faq_content_hash(paths):
+    """Hash the raw bytes of the FAQ JSON files; changes whenever their content changes"""
+    digest = hashlib.sha256()
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(b'<missing>')
+    return digest.hexdigest()[:16]
+
+
+class AnswerCache:
+    """Size-bounded LRU cache of generated answers with TTL and FAQ-version invalidation
+
+    Expired answers are not served by get() but stay in the LRU until evicted
+    or replaced, so stale() can still return them while Gemini is down.
+    put() can give an entry its own TTL (e.g. pre-generated warm answers,
+    which only go out of date when the FAQ version changes); 0 never expires.
+    """
+
+    def __init__(self, max_entries=500, ttl_seconds=3600, faq_version=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.faq_version = faq_version
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_hits = 0
+
+    def make_key(self, question, language, sections):
+        """Build a key from the normalized question, language, chosen FAQ section names and FAQ version
+
+        The version makes keys from before a FAQ change unreachable, so a call
+        that started on the old FAQ and finishes after set_faq_version() cannot
+        put an outdated answer where new lookups would find it.
+        """
+        with self._lock:
+            version = self.faq_version or ''
+        raw = '\x1f'.join([normalize_question(question), language, ','.join(sorted(sections)), version])
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return a cached answer or None, counting the hit or miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            answer, stored_at, ttl_seconds = entry
+            if ttl_seconds and now - stored_at > ttl_seconds:
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return answer
+
+    def peek(self, key):
+        """Return a fresh cached answer without touching LRU order or counters"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or (entry[2] and time.monotonic() - entry[1] > entry[2]):
+            return None
+        return entry[0]
+
+    def stale(self, key):
+        """Return a cached answer regardless of its age (for fallbacks), or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self.stale_hits += 1
+            return entry[0]
+
+    def put(self, key, answer, stored_at=None, ttl_seconds=None):
+        """Store an answer, evicting the least recently used entries beyond max_entries
+
+        ttl_seconds overrides the cache TTL for this entry (0 keeps it until evicted or the FAQ changes).
+        """
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (answer, stored_at if stored_at is not None else time.monotonic(), ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_faq_version(self, version):
+        """Drop every entry when the FAQ content hash changes"""
+        with self._lock:
+            if version == self.faq_version:
+                return False
+            self.faq_version = version
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+            return True
+
+    def stats(self):
+        """Return entry count and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'faq_version': self.faq_version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'stale_hits': self.stale_hits
+            }
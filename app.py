@@ -3,11 +3,21 @@ import json
 import time
 import re
 import logging
+import threading
 from flask import Flask, request, jsonify
 import requests
 from dotenv import load_dotenv
-import gspread
-from google.oauth2.service_account import Credentials
+from job_queue import JobQueue
+from metrics import LatencyTracker
+from keyed_executor import KeyedExecutor
+from message_dedup import MessageDeduplicator
+from sheets_client import SheetsClientHolder, credentials_from_file
+from booking_sync import BookingService, confirmation_eta
+from whatsapp_client import WhatsAppClient
+from deadline import Deadline, DeadlineStats
+from rate_limiter import OutboundLimiter
+from conversation_store import create_state_store
+from conversation_journal import ConversationJournal
 
 load_dotenv()
 
@@ -24,6 +34,50 @@ LEADS_SHEET_NAME = os.getenv("LEADS_SHEET_NAME", "Brookstone Leads")
 SITE_VISITS_SHEET_NAME = os.getenv("SITE_VISITS_SHEET_NAME", "Brookstone Site Visits")
 BROCHURE_MEDIA_ID = os.getenv("BROCHURE_MEDIA_ID", "1562506805130847")
 
+# Background message processing
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "8"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "500"))
+MAX_PENDING_PER_SENDER = int(os.getenv("MAX_PENDING_PER_SENDER", "20"))
+# Redelivered webhooks: exact window for recent message IDs, bloom filters for older ones
+DEDUP_EXACT_WINDOW = int(os.getenv("DEDUP_EXACT_WINDOW", "900"))
+DEDUP_MAX_EXACT = int(os.getenv("DEDUP_MAX_EXACT", "50000"))
+DEDUP_BLOOM_WINDOW = int(os.getenv("DEDUP_BLOOM_WINDOW", "43200"))
+# IDs per bloom generation; ~3.6 bytes each at the 1e-6 error rate, two generations are kept
+DEDUP_BLOOM_CAPACITY = int(os.getenv("DEDUP_BLOOM_CAPACITY", "200000"))
+# Time budget per message from webhook receipt to reply; the send reserve is kept back for delivering it
+MESSAGE_DEADLINE_SECONDS = float(os.getenv("MESSAGE_DEADLINE_SECONDS", "30"))
+SEND_RESERVE_SECONDS = float(os.getenv("SEND_RESERVE_SECONDS", "5"))
+GEMINI_MIN_ATTEMPT_SECONDS = float(os.getenv("GEMINI_MIN_ATTEMPT_SECONDS", "3"))
+# Outbound WhatsApp limits: number-wide throughput and the per-user pair rate (one message per interval after a burst)
+WHATSAPP_RATE_PER_SECOND = float(os.getenv("WHATSAPP_RATE_PER_SECOND", "80"))
+WHATSAPP_BURST = int(os.getenv("WHATSAPP_BURST", "80"))
+WHATSAPP_PAIR_INTERVAL = float(os.getenv("WHATSAPP_PAIR_INTERVAL", "6"))
+WHATSAPP_PAIR_BURST = int(os.getenv("WHATSAPP_PAIR_BURST", "10"))
+WHATSAPP_MAX_RETRIES = int(os.getenv("WHATSAPP_MAX_RETRIES", "3"))
+
+# Site visit sheet sync
+BOOKING_SYNC_BATCH_SIZE = int(os.getenv("BOOKING_SYNC_BATCH_SIZE", "200"))
+BOOKING_STATUS_MAX_ATTEMPTS = int(os.getenv("BOOKING_STATUS_MAX_ATTEMPTS", "4"))
+BOOKING_DISPATCH_WORKERS = int(os.getenv("BOOKING_DISPATCH_WORKERS", "8"))
+BOOKING_DISPATCH_RATE = float(os.getenv("BOOKING_DISPATCH_RATE", "20"))  # confirmations per second
+# Form submissions pushed to /bookings/notify; polling then only reconciles missed pushes
+BOOKING_WEBHOOK_TOKEN = os.getenv("BOOKING_WEBHOOK_TOKEN")
+BOOKING_POLL_INTERVAL = int(os.getenv("BOOKING_POLL_INTERVAL", "3600" if BOOKING_WEBHOOK_TOKEN else "300"))
+# Pushed submissions run on their own workers so a long reconciliation cycle never holds up chat replies
+BOOKING_PUSH_WORKERS = int(os.getenv("BOOKING_PUSH_WORKERS", "2"))
+
+# Conversation state limits
+CONV_MAX_USERS = int(os.getenv("CONV_MAX_USERS", "10000"))
+CONV_IDLE_TTL = int(os.getenv("CONV_IDLE_TTL", "86400"))
+CONV_HISTORY_LIMIT = int(os.getenv("CONV_HISTORY_LIMIT", "20"))
+# 'memory' (single process) or 'sqlite' (shared by all worker processes on this machine)
+CONV_STORE_BACKEND = os.getenv("CONV_STORE_BACKEND", "memory")
+CONV_STORE_PATH = os.getenv("CONV_STORE_PATH", "conversations.db")
+# Journal + snapshots for the memory backend so restarts keep conversations (empty = disabled)
+CONV_JOURNAL_DIR = os.getenv("CONV_JOURNAL_DIR", "")
+CONV_SNAPSHOT_INTERVAL = int(os.getenv("CONV_SNAPSHOT_INTERVAL", "300"))
+CONV_RETENTION_SECONDS = int(os.getenv("CONV_RETENTION_SECONDS", str(CONV_IDLE_TTL)))
+
 # ===== LOAD FAQ DATA =====
 def load_faq_data():
     """Load FAQ data from JSON files for both languages"""
@@ -46,9 +100,48 @@ def load_faq_data():
 
 FAQ_DATA = load_faq_data()
 
-# ===== IN-MEMORY CONVERSATION STATE =====
-# For production, use Redis or a database
-CONV_STATE = {}
+# ===== CONVERSATION STATE =====
+# Bounded: history is a ring buffer, idle users expire after CONV_IDLE_TTL, and the
+# least recently active users are dropped beyond CONV_MAX_USERS
+CONV_JOURNAL = None
+if CONV_JOURNAL_DIR and CONV_STORE_BACKEND == 'memory':
+    CONV_JOURNAL = ConversationJournal(
+        CONV_JOURNAL_DIR,
+        snapshot_interval=CONV_SNAPSHOT_INTERVAL,
+        retention_seconds=CONV_RETENTION_SECONDS
+    )
+
+CONV_STATE = create_state_store(
+    CONV_STORE_BACKEND,
+    path=CONV_STORE_PATH,
+    journal=CONV_JOURNAL,
+    max_entries=CONV_MAX_USERS,
+    ttl_seconds=CONV_IDLE_TTL,
+    history_limit=CONV_HISTORY_LIMIT
+)
+
+if CONV_JOURNAL is not None:
+    CONV_STATE.restore()
+    CONV_JOURNAL.start_compaction()
+    replay = CONV_JOURNAL.last_replay
+    logging.info(
+        f"♻️ Restored {replay['conversations']} conversations in {replay['duration_ms']} ms "
+        f"({replay['snapshot_records']} snapshot + {replay['journal_records']} journal records; "
+        f"snapshot every {CONV_SNAPSHOT_INTERVAL}s, retention {CONV_RETENTION_SECONDS}s)"
+    )
+
+# ===== BACKGROUND MESSAGE QUEUE =====
+# The webhook only enqueues; read receipts, generation and replies run on these workers
+MESSAGE_QUEUE = JobQueue('messages', workers=WEBHOOK_WORKERS, max_size=WEBHOOK_QUEUE_SIZE)
+# Sharded by sender phone: one user's messages run in arrival order (so CONV_STATE
+# is never mutated concurrently for the same user), different users run in parallel
+MESSAGE_EXECUTOR = KeyedExecutor(MESSAGE_QUEUE, max_pending_per_key=MAX_PENDING_PER_SENDER)
+MESSAGE_DEDUP = MessageDeduplicator(
+    exact_window_seconds=DEDUP_EXACT_WINDOW,
+    max_exact=DEDUP_MAX_EXACT,
+    bloom_window_seconds=DEDUP_BLOOM_WINDOW,
+    bloom_capacity=DEDUP_BLOOM_CAPACITY
+)
 
 # ===== LANGUAGE DETECTION =====
 def detect_language(text):
@@ -61,22 +154,29 @@ def detect_language(text):
     return 'english'
 
 # ===== WHATSAPP API FUNCTIONS =====
-def send_whatsapp_text(to_phone, message):
+# One pooled keep-alive session shared by all workers (plus headroom for the booking checker)
+WHATSAPP_LIMITER = OutboundLimiter(
+    rate_per_second=WHATSAPP_RATE_PER_SECOND,
+    burst=WHATSAPP_BURST,
+    pair_rate_per_second=1 / WHATSAPP_PAIR_INTERVAL,
+    pair_burst=WHATSAPP_PAIR_BURST
+)
+WHATSAPP_CLIENT = WhatsAppClient(
+    WHATSAPP_TOKEN, WHATSAPP_PHONE_NUMBER_ID,
+    pool_size=WEBHOOK_WORKERS + BOOKING_DISPATCH_WORKERS + 2,
+    limiter=WHATSAPP_LIMITER,
+    max_retries=WHATSAPP_MAX_RETRIES,
+    min_send_wait=WHATSAPP_PAIR_INTERVAL
+)
+
+DEADLINE_STATS = DeadlineStats(MESSAGE_DEADLINE_SECONDS)
+
+def send_whatsapp_text(to_phone, message, deadline=None):
     """Send a text message via WhatsApp Cloud API"""
-    url = f"https://graph.facebook.com/v23.0/{WHATSAPP_PHONE_NUMBER_ID}/messages"
-    headers = {
-        "Authorization": f"Bearer {WHATSAPP_TOKEN}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "messaging_product": "whatsapp",
-        "to": to_phone,
-        "type": "text",
-        "text": {"body": message}
-    }
-    
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=15)
+        # Past the deadline the reply still goes out, with a short timeout
+        timeout = deadline.timeout(15, floor=3) if deadline else 15
+        response = WHATSAPP_CLIENT.send_text(to_phone, message, timeout=timeout, deadline=deadline)
         if response.status_code == 200:
             logging.info(f"✅ Message sent to {to_phone}")
             return True
@@ -88,27 +188,11 @@ def send_whatsapp_text(to_phone, message):
         return False
 
 
-def send_whatsapp_document(to_phone, document_id, caption="Here is your Brookstone Brochure 📄"):
+def send_whatsapp_document(to_phone, document_id, caption="Here is your Brookstone Brochure 📄", deadline=None):
     """Send WhatsApp document (PDF brochure) using Facebook Graph API"""
-    url = f"https://graph.facebook.com/v23.0/{WHATSAPP_PHONE_NUMBER_ID}/messages"
-    headers = {
-        "Authorization": f"Bearer {WHATSAPP_TOKEN}",
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "messaging_product": "whatsapp",
-        "to": to_phone,
-        "type": "document",
-        "document": {
-            "id": document_id,
-            "caption": caption,
-            "filename": "Brookstone.pdf"
-        }
-    }
-    
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=15)
+        timeout = deadline.timeout(15, floor=3) if deadline else 15
+        response = WHATSAPP_CLIENT.send_document(to_phone, document_id, caption, timeout=timeout, deadline=deadline)
         if response.status_code == 200:
             logging.info(f"✅ Document sent to {to_phone}")
             return True
@@ -120,97 +204,33 @@ def send_whatsapp_document(to_phone, document_id, caption="Here is your Brooksto
         return False
 
 
-def mark_message_as_read(message_id):
+def mark_message_as_read(message_id, deadline=None):
     """Mark a WhatsApp message as read"""
-    url = f"https://graph.facebook.com/v23.0/{WHATSAPP_PHONE_NUMBER_ID}/messages"
-    headers = {
-        "Authorization": f"Bearer {WHATSAPP_TOKEN}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "messaging_product": "whatsapp",
-        "status": "read",
-        "message_id": message_id
-    }
-    
+    # The read receipt is optional; never let it eat into the time reserved for the reply
+    if deadline and not deadline.allows(1, reserve=SEND_RESERVE_SECONDS):
+        DEADLINE_STATS.skip('read')
+        return
     try:
-        requests.post(url, headers=headers, json=payload, timeout=10)
+        timeout = deadline.timeout(10, reserve=SEND_RESERVE_SECONDS) if deadline else 10
+        WHATSAPP_CLIENT.mark_read(message_id, timeout=timeout, deadline=deadline)
     except Exception as e:
         logging.error(f"Error marking message as read: {e}")
 
 
 # ===== GOOGLE SHEETS FUNCTIONS =====
-def check_new_bookings():
-    """Check for new entries in the Google Sheet and send confirmation messages"""
-    try:
-        scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-        creds = Credentials.from_service_account_file('credentials.json', scopes=scope)
-        client = gspread.authorize(creds)
-        
-        # Open the site visits sheet
-        sheet = client.open(SITE_VISITS_SHEET_NAME).sheet1
-        
-        # Get all records
-        all_records = sheet.get_all_records()
-        
-        for record in all_records:
-            # Check if this is a new record that hasn't been processed
-            if not record.get('Status'):  # New form submissions won't have a status
-                phone = record.get('Phone')
-                name = record.get('Name')
-                date = record.get('Preferred Date')
-                time = record.get('Preferred Time')
-                unit = record.get('Unit Type')
-                budget = record.get('Budget')
-                
-                # Format phone number if needed
-                if phone:
-                    # Remove any spaces, dashes or special characters
-                    phone = re.sub(r'[^0-9+]', '', phone)
-                    # Add +91 if not present and it's a 10-digit number
-                    if len(phone) == 10 and not phone.startswith('+'):
-                        phone = f"+91{phone}"
-                
-                if phone and name and date and time:
-                    # Format the confirmation message
-                    message = f"""🎉 *Site Visit Booking Confirmed!*
-
-Dear {name},
-
-Thank you for booking a site visit at Brookstone. Your appointment details:
-
-📅 Date: {date}
-⏰ Time: {time}
-🏠 Unit Interest: {unit}
-💰 Budget Range: {budget}
-
-📍 *Location:*
-Brookstone Show Flat
-B/S, Vaikunth Bungalows, Next to Oxygen Park
-DPS-Bopal Road, Shilaj, Ahmedabad - 380059
-
-Our team will be ready to welcome you! Please carry a valid ID proof.
-
-Need to reschedule? Contact us at: +91 1234567890
-
-Looking forward to showing you your future home! 🌟
-
-_Note: You'll receive a reminder message 1 day before your visit._"""
-
-                    # Send WhatsApp confirmation
-                    if send_whatsapp_text(phone, message):
-                        # Update status to confirmed
-                        row_num = all_records.index(record) + 2  # +2 because sheet is 1-indexed and we have header row
-                        sheet.update_cell(row_num, sheet.find('Status').col, 'Confirmed')
-                        logging.info(f"✅ Site visit confirmed for {name} on {date} at {time}")
-                    else:
-                        sheet.update_cell(row_num, sheet.find('Status').col, 'Pending - WhatsApp Failed')
-        
-        return True
-    
-    except Exception as e:
-        logging.error(f"Error checking new bookings: {e}")
-        return False
+SHEETS = SheetsClientHolder(credentials_from_file)
+BOOKINGS = BookingService(
+    SHEETS, SITE_VISITS_SHEET_NAME,
+    lambda to, message: send_whatsapp_text(to, message),
+    webhook_token=BOOKING_WEBHOOK_TOKEN,
+    poll_interval=BOOKING_POLL_INTERVAL,
+    batch_size=BOOKING_SYNC_BATCH_SIZE,
+    status_max_attempts=BOOKING_STATUS_MAX_ATTEMPTS,
+    dispatch_workers=BOOKING_DISPATCH_WORKERS,
+    dispatch_rate=BOOKING_DISPATCH_RATE,
+    push_workers=BOOKING_PUSH_WORKERS,
+    push_queue_size=WEBHOOK_QUEUE_SIZE
+)
 
 
 def extract_budget_from_text(text):
@@ -329,7 +349,7 @@ def create_gemini_prompt(user_question, faq_data, language='english', chat_histo
     # Build conversation context
     conversation_context = ""
     if chat_history and len(chat_history) > 0:
-        recent_history = chat_history[-4:] if len(chat_history) > 4 else chat_history
+        recent_history = list(chat_history)[-4:]
         conversation_context = "\n\nRECENT CONVERSATION:\n"
         for msg, is_user in recent_history:
             role = "User" if is_user else "Bot"
@@ -360,7 +380,7 @@ ANSWER:"""
     return prompt
 
 
-def call_gemini_api(prompt, language='english'):
+def call_gemini_api(prompt, language='english', deadline=None):
     """Call Google Gemini API with retry logic"""
     if not GEMINI_API_KEY:
         return "⚠️ Please configure your Gemini API key"
@@ -374,16 +394,26 @@ def call_gemini_api(prompt, language='english'):
         }
     }
     
+    timeout = 30
+    out_of_time = False
     for attempt in range(2):
+        # Skip attempts (and the 2 s pause before a retry) that cannot finish before the reply is due
+        if deadline is not None:
+            if not deadline.allows(GEMINI_MIN_ATTEMPT_SECONDS + (2 if attempt else 0), reserve=SEND_RESERVE_SECONDS):
+                DEADLINE_STATS.skip('gemini_retry' if attempt else 'gemini')
+                out_of_time = True
+                break
         try:
             if attempt > 0:
                 time.sleep(2)
+            if deadline is not None:
+                timeout = deadline.timeout(30, reserve=SEND_RESERVE_SECONDS, floor=1)
             
             response = requests.post(
                 f"{GEMINI_API_URL}?key={GEMINI_API_KEY}",
                 headers=headers,
                 json=data,
-                timeout=30
+                timeout=timeout
             )
             
             if response.status_code == 200:
@@ -399,51 +429,50 @@ def call_gemini_api(prompt, language='english'):
             logging.error(f"Gemini API exception: {e}")
             continue
     
+    if out_of_time:
+        DEADLINE_STATS.fallback()
     return "Sorry, I'm having trouble answering right now. Please try again or contact our agent at +91 1234567890."
 
 
 # ===== MESSAGE PROCESSING LOGIC =====
-def process_incoming_message(from_phone, message_text, message_id):
+def process_incoming_message(from_phone, message_text, message_id, deadline=None):
     """Process incoming WhatsApp message and generate response"""
-    
-    # Get or create user state
-    if from_phone not in CONV_STATE:
-        CONV_STATE[from_phone] = {
-            'chat_history': [],
-            'lead_capture_mode': None,
-            'user_phone': from_phone,
-            'language': 'english',
-            'asked_about_brochure': False,
-            'booking_info': {}
-        }
-    
-    state = CONV_STATE[from_phone]
+    # Load, update and save back with a version check so other worker processes don't lose updates
+    state = CONV_STATE.load(from_phone)
+    try:
+        return handle_conversation_turn(state, from_phone, message_text, message_id, deadline)
+    finally:
+        CONV_STATE.commit(state)
+
+
+def handle_conversation_turn(state, from_phone, message_text, message_id, deadline=None):
+    """Update the user's conversation state for one message and return the reply"""
     user_lower = message_text.lower().strip()
     
     # Detect language from user's message
     detected_lang = detect_language(message_text)
-    state['language'] = detected_lang  # Update user's preferred language
+    state.language = detected_lang  # Update user's preferred language
     
     # Add user message to history
-    state['chat_history'].append((message_text, True))
+    state.add_turn(message_text, True)
     
     # ===== HANDLE PHONE NUMBER FOR BROCHURE =====
-    if state.get('lead_capture_mode') == 'phone_for_brochure':
+    if state.lead_capture_mode == 'phone_for_brochure':
         phone_pattern = r'\b(?:\+91[\s-]?)?[6-9]\d{9}\b'
         phone_match = re.search(phone_pattern, message_text)
         
         if phone_match:
             phone_number = phone_match.group().replace(' ', '').replace('-', '')
-            state['user_phone'] = phone_number
-            state['lead_capture_mode'] = None
+            state.user_phone = phone_number
+            state.lead_capture_mode = None
             
-            success = send_whatsapp_document(phone_number, BROCHURE_MEDIA_ID)
+            success = send_whatsapp_document(phone_number, BROCHURE_MEDIA_ID, deadline=deadline)
             
             if not success:
                 reply = """I apologize, but there was an issue sending the brochure to your WhatsApp. 
 
 Please try again later or contact our agent directly at +91 1234567890."""
-                state['chat_history'].append((reply, False))
+                state.add_turn(reply, False)
                 return reply
                 
             return None
@@ -451,39 +480,39 @@ Please try again later or contact our agent directly at +91 1234567890."""
             reply = """I didn't find a valid phone number. Please share your *10-digit mobile number* to send the brochure.
 
 For example: 9876543210 or +91 9876543210"""
-            state['chat_history'].append((reply, False))
+            state.add_turn(reply, False)
             return reply
     
     # ===== DETECT BROCHURE REQUEST =====
     brochure_keywords = ['brochure', 'pdf', 'download', 'send brochure', 'share brochure', 'floor plan', 'send pdf']
     if any(kw in user_lower for kw in brochure_keywords):
-        state['asked_about_brochure'] = True
+        state.asked_about_brochure = True
         
         # Send brochure directly to the phone number that messaged us
-        success = send_whatsapp_document(from_phone, BROCHURE_MEDIA_ID)
+        success = send_whatsapp_document(from_phone, BROCHURE_MEDIA_ID, deadline=deadline)
         
         if not success:
             reply = """I apologize, but there was an issue sending the brochure.
 
 Please contact our agent at +91 1234567890 for assistance."""
-            state['chat_history'].append((reply, False))
+            state.add_turn(reply, False)
             return reply
             
         return None
     
     # ===== HANDLE AFFIRMATIVE RESPONSE TO BROCHURE =====
-    if state.get('asked_about_brochure', False):
-        state['asked_about_brochure'] = False
+    if state.asked_about_brochure:
+        state.asked_about_brochure = False
         
         affirmative_patterns = ['yes', 'yeah', 'yup', 'sure', 'ok', 'okay', 'please', 'send', 'want', 'need']
         
         if any(a in user_lower for a in affirmative_patterns):
-            success = send_whatsapp_document(from_phone, BROCHURE_MEDIA_ID)
+            success = send_whatsapp_document(from_phone, BROCHURE_MEDIA_ID, deadline=deadline)
             
             if not success:
                 reply = """❌ There was an issue sending your brochure on WhatsApp.
 Please contact our agent at +91 1234567890."""
-                state['chat_history'].append((reply, False))
+                state.add_turn(reply, False)
                 return reply
                 
             return None
@@ -502,7 +531,7 @@ You can also call on the same number for a phone conversation.
 
 Is there anything else about Brookstone I can help you with? 🏠"""
         
-        state['chat_history'].append((reply, False))
+        state.add_turn(reply, False)
         return reply
     
     # ===== HANDLE SITE VISIT BOOKING =====
@@ -524,21 +553,21 @@ The form will ask for:
 • Unit Type Interest
 • Budget Range
 
-Once you submit the form, you will receive a confirmation message here on WhatsApp within 15 minutes.
+Once you submit the form, you will receive a confirmation message here on WhatsApp {confirmation_eta('english', BOOKINGS.push_enabled)}.
 
 Need help with the form? Feel free to ask! 😊
 
 _Tip: Make sure to provide accurate contact details in the form as we'll send the confirmation on the same WhatsApp number._ 📱"""
         
-        state['chat_history'].append((reply, False))
+        state.add_turn(reply, False)
         return reply
         
-        state['chat_history'].append((reply, False))
+        state.add_turn(reply, False)
         return reply
     
     # ===== HANDLE BOOKING FORM SUBMISSION =====
-    if state.get('lead_capture_mode') == 'booking':
-        booking_info = state['booking_info']
+    if state.lead_capture_mode == 'booking':
+        booking_info = state.booking_info
         current_step = booking_info.get('current_step')
         
         if current_step == 'name':
@@ -554,7 +583,7 @@ Reply with:
 1️⃣ *Yes* to confirm this number
 2️⃣ Or type your *alternate number*"""
             
-            state['chat_history'].append((reply, False))
+            state.add_turn(reply, False)
             return reply
             
         elif current_step == 'confirm_phone':
@@ -570,7 +599,7 @@ Reply with:
                     reply = """Please provide a valid 10-digit phone number or type *Yes* to confirm the existing number.
 
 Example: 9876543210 or +91 9876543210"""
-                    state['chat_history'].append((reply, False))
+                    state.add_turn(reply, False)
                     return reply
             
             booking_info['phone'] = phone
@@ -581,7 +610,7 @@ Example: 9876543210 or +91 9876543210"""
 Format: DD/MM/YYYY
 Example: 05/11/2025"""
             
-            state['chat_history'].append((reply, False))
+            state.add_turn(reply, False)
             return reply
             
         elif current_step == 'date':
@@ -591,7 +620,7 @@ Example: 05/11/2025"""
                 reply = """Please provide the date in the correct format (DD/MM/YYYY).
 
 Example: 05/11/2025"""
-                state['chat_history'].append((reply, False))
+                state.add_turn(reply, False)
                 return reply
             
             booking_info['date'] = message_text
@@ -608,7 +637,7 @@ Available slots:
 
 Reply with the slot number (1-5) or type the time."""
             
-            state['chat_history'].append((reply, False))
+            state.add_turn(reply, False)
             return reply
             
         elif current_step == 'time':
@@ -636,7 +665,7 @@ Reply with the slot number (1-5) or type the time."""
 
 Please reply with 1, 2, or 3."""
             
-            state['chat_history'].append((reply, False))
+            state.add_turn(reply, False)
             return reply
             
         elif current_step == 'unit_type':
@@ -651,7 +680,7 @@ Please reply with 1, 2, or 3."""
 1️⃣ for 3 BHK
 2️⃣ for 4 BHK
 3️⃣ for Both options"""
-                state['chat_history'].append((reply, False))
+                state.add_turn(reply, False)
                 return reply
             
             booking_info['unit_type'] = unit_types[message_text]
@@ -666,7 +695,7 @@ Example formats:
 • 2 Crore
 • 150 Lakhs"""
             
-            state['chat_history'].append((reply, False))
+            state.add_turn(reply, False)
             return reply
             
         elif current_step == 'budget':
@@ -674,7 +703,7 @@ Example formats:
             if not budget:
                 reply = """Please specify your budget in a clear format:
 Example: 1.5 Cr, 2 Crore, or 150 Lakhs"""
-                state['chat_history'].append((reply, False))
+                state.add_turn(reply, False)
                 return reply
             
             booking_info['budget'] = budget
@@ -683,7 +712,7 @@ Example: 1.5 Cr, 2 Crore, or 150 Lakhs"""
             google_form_url = "https://docs.google.com/forms/d/e/1FAIpQLSceds-nIr9vTLHJ0Jl1TOv0DNYGQhb0CtEa2R3mA9Ae3iP8Lg/viewform"
             
             # Clear booking mode
-            state['lead_capture_mode'] = None
+            state.lead_capture_mode = None
             
             reply = f"""� To complete your booking, please fill out our site visit form:
 
@@ -693,26 +722,48 @@ Once you submit the form, you'll receive a confirmation message with all the det
 
 Need help with anything else? �"""
             
-            state['asked_about_brochure'] = True
-            state['chat_history'].append((reply, False))
+            state.asked_about_brochure = True
+            state.add_turn(reply, False)
             return reply
     
     # ===== EXTRACT AND SAVE BUDGET =====
     budget = extract_budget_from_text(message_text)
-    if budget and state.get('booking_info'):
+    if budget and state.booking_info:
         # Since we're now using Google Forms to collect budget
         # Simply log for tracking
         logging.info(f"Budget indicated by {from_phone}: {budget}")
     
     # ===== DEFAULT: USE GEMINI FOR GENERAL QUESTIONS =====
-    chat_history = state.get('chat_history', [])
-    prompt = create_gemini_prompt(message_text, FAQ_DATA, state['language'], chat_history)
-    ai_response = call_gemini_api(prompt, state['language'])
+    chat_history = state.chat_history
+    prompt = create_gemini_prompt(message_text, FAQ_DATA, state.language, chat_history)
+    ai_response = call_gemini_api(prompt, state.language, deadline)
     
-    state['chat_history'].append((ai_response, False))
+    state.add_turn(ai_response, False)
     return ai_response
 
 
+def handle_incoming_message(from_phone, text, message_id, deadline=None):
+    """Worker job: mark as read, generate the reply and send it back within the message's deadline"""
+    if deadline is None:
+        deadline = Deadline(MESSAGE_DEADLINE_SECONDS)
+    deadline.mark('queue')
+    
+    # Mark message as read
+    mark_message_as_read(message_id, deadline)
+    deadline.mark('read')
+    
+    # Process the message and get response
+    response_text = process_incoming_message(from_phone, text, message_id, deadline)
+    deadline.mark('reply')
+    
+    # Send response back
+    if response_text:
+        send_whatsapp_text(from_phone, response_text, deadline)
+        deadline.mark('send')
+    
+    DEADLINE_STATS.record(deadline)
+
+
 # ===== WEBHOOK ROUTES =====
 @app.route('/webhook', methods=['GET'])
 def verify_webhook():
@@ -738,6 +789,7 @@ def webhook():
     
     logging.info(f"Incoming webhook: {json.dumps(data, indent=2)[:500]}...")
     
+    rejected = 0
     try:
         # Parse WhatsApp Cloud API webhook structure
         for entry in data.get('entry', []):
@@ -751,6 +803,11 @@ def webhook():
                     message_id = message.get('id')
                     msg_type = message.get('type')
                     
+                    # Meta redelivers when we are slow; never process the same message twice
+                    if message_id and MESSAGE_DEDUP.seen(message_id):
+                        logging.info(f"🔁 Ignoring duplicate delivery of message {message_id}")
+                        continue
+                    
                     text = ''
                     
                     if msg_type == 'text':
@@ -770,21 +827,31 @@ def webhook():
                     
                     logging.info(f"📱 Message from {from_phone}: {text}")
                     
-                    # Mark message as read
-                    mark_message_as_read(message_id)
-                    
-                    # Process the message and get response
-                    response_text = process_incoming_message(from_phone, text, message_id)
-                    
-                    # Send response back
-                    send_whatsapp_text(from_phone, response_text)
+                    # Hand off to the worker pool so Meta gets its 200 immediately
+                    # The time budget starts now, so queueing delay counts against it
+                    deadline = Deadline(MESSAGE_DEADLINE_SECONDS)
+                    if not MESSAGE_EXECUTOR.submit(from_phone, handle_incoming_message, from_phone, text, message_id, deadline):
+                        # Let Meta's retry through since we never processed this one
+                        MESSAGE_DEDUP.discard(message_id)
+                        rejected += 1
     
     except Exception as e:
         logging.exception('❌ Error processing webhook')
     
+    if rejected:
+        # Let Meta redeliver later instead of silently dropping messages
+        return jsonify({'status': 'busy'}), 503
+    
     return jsonify({'status': 'ok'}), 200
 
 
+@app.route('/bookings/notify', methods=['POST'])
+def bookings_notify():
+    """Push endpoint for site visit form submissions (e.g. an Apps Script on-submit trigger)"""
+    body, status = BOOKINGS.handle_push(request.headers.get('X-Booking-Token', ''), request.get_json(silent=True))
+    return jsonify(body), status
+
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
@@ -795,6 +862,21 @@ def health():
     }), 200
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Runtime statistics for the background processing subsystems"""
+    return jsonify({
+        'message_queue': MESSAGE_QUEUE.stats(),
+        'sender_executor': MESSAGE_EXECUTOR.stats(),
+        'message_dedup': MESSAGE_DEDUP.stats(),
+        'sheets_client': SHEETS.stats(),
+        **BOOKINGS.stats(),
+        'whatsapp_api': WHATSAPP_CLIENT.stats(),
+        'message_deadlines': DEADLINE_STATS.stats(),
+        'conversations': CONV_STATE.stats()
+    }), 200
+
+
 @app.route('/', methods=['GET'])
 def home():
     """Home endpoint"""
@@ -802,21 +884,13 @@ def home():
         'message': 'Brookstone WhatsApp Bot is running!',
         'endpoints': {
             'webhook': '/webhook',
-            'health': '/health'
+            'bookings_notify': '/bookings/notify',
+            'health': '/health',
+            'metrics': '/metrics'
         }
     }), 200
 
 
-def check_bookings_periodically():
-    """Check for new bookings every 5 minutes"""
-    while True:
-        try:
-            check_new_bookings()
-            time.sleep(300)  # Sleep for 5 minutes
-        except Exception as e:
-            logging.error(f"Error in periodic booking check: {e}")
-            time.sleep(60)  # If error occurs, retry after 1 minute
-
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     logging.info(f"🚀 Starting Brookstone WhatsApp Bot on port {port}")
@@ -824,8 +898,7 @@ if __name__ == '__main__':
     logging.info(f"Gemini configured: {bool(GEMINI_API_KEY)}")
     
     # Start booking checker in a separate thread
-    import threading
-    booking_checker = threading.Thread(target=check_bookings_periodically, daemon=True)
+    booking_checker = threading.Thread(target=BOOKINGS.run_periodically, daemon=True)
     booking_checker.start()
     
     app.run(host='0.0.0.0', port=port, debug=False)
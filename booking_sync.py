@@ -0,0 +1,520 @@
+"""Site visit sheet sync: incremental reads, batched status write-back and push payloads
+
+BookingService wires these together for the bot entry points (whatsapp_bot.py
+and app.py): reconciliation polling, pushed submissions and their metrics.
+
+Form submissions can be pushed to POST /bookings/notify with an
+`X-Booking-Token` header, e.g. from an Apps Script on-form-submit trigger:
+
+    function onFormSubmit(e) {
+      UrlFetchApp.fetch(BOT_URL + '/bookings/notify', {
+        method: 'post', contentType: 'application/json',
+        headers: {'X-Booking-Token': TOKEN},
+        payload: JSON.stringify({row: e.range.getRow(), values: e.namedValues})
+      });
+    }
+
+`python booking_sync.py --url http://localhost:5000 --token ... --row 5 --phone ...`
+posts a fake submission the same way for local testing.
+"""
+import sys
+import hmac
+import argparse
+import re
+import time
+import random
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from gspread.exceptions import APIError
+from gspread.utils import rowcol_to_a1
+
+from metrics import LatencyTracker
+from job_queue import JobQueue
+
+
+def normalize_phone(phone):
+    """Strip formatting from a sheet phone number and add +91 to bare 10-digit numbers"""
+    if not phone:
+        return phone
+    # Remove any spaces, dashes or special characters
+    phone = re.sub(r'[^0-9+]', '', str(phone))
+    # Add +91 if not present and it's a 10-digit number
+    if len(phone) == 10 and not phone.startswith('+'):
+        phone = f"+91{phone}"
+    return phone
+
+
+def parse_booking_payload(payload):
+    """Turn a pushed form submission into (row_number, record)
+
+    Accepts {"row": 12, "values": {...}} where values maps sheet headers to
+    answers; Apps Script namedValues lists (["answer"]) are unwrapped.
+    Raises ValueError when the row number or values are missing.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("payload must be a JSON object")
+    try:
+        row_num = int(payload.get('row'))
+    except (TypeError, ValueError):
+        raise ValueError("'row' must be the sheet row number of the submission")
+    if row_num < 2:
+        raise ValueError("'row' must point below the header row")
+    values = payload.get('values')
+    if not isinstance(values, dict) or not values:
+        raise ValueError("'values' must map sheet headers to answers")
+    record = {}
+    for name, value in values.items():
+        if isinstance(value, list):
+            value = value[0] if value else ''
+        record[str(name).strip()] = value
+    return row_num, record
+
+
+def confirmation_eta(language, push_enabled):
+    """How soon a form submission is confirmed, as promised in the site visit reply"""
+    if language == 'gujarati':
+        return 'એક મિનિટની અંદર' if push_enabled else '15 મિનિટની અંદર'
+    return 'within a minute' if push_enabled else 'within 15 minutes'
+
+
+def read_row_status(sheet, row_num, status_col):
+    """Current Status cell of a sheet row ('' when it is empty or the sheet has no Status column)"""
+    if status_col is None:
+        return ''
+    return sheet.cell(row_num, status_col).value or ''
+
+
+def build_confirmation_message(record):
+    """Format the WhatsApp confirmation for one site visit form submission"""
+    return f"""🎉 *Site Visit Booking Confirmed!*
+
+Dear {record.get('Name')},
+
+Thank you for booking a site visit at Brookstone. Your appointment details:
+
+📅 Date: {record.get('Preferred Date')}
+⏰ Time: {record.get('Preferred Time')}
+🏠 Unit Interest: {record.get('Unit Type')}
+💰 Budget Range: {record.get('Budget')}
+
+📍 *Location:*
+Brookstone Show Flat
+B/S, Vaikunth Bungalows, Next to Oxygen Park
+DPS-Bopal Road, Shilaj, Ahmedabad - 380059
+
+Our team will be ready to welcome you! Please carry a valid ID proof.
+
+Need to reschedule? Contact us at: +91 1234567890
+
+Looking forward to showing you your future home! 🌟
+
+_Note: You'll receive a reminder message 1 day before your visit._"""
+
+
+class BookingSheetCursor:
+    """Incremental reader for the site visit sheet
+
+    Remembers the first row not yet examined (the high-water mark) and the
+    header/column map, so each cycle reads only newly appended rows with
+    bounded range requests instead of get_all_records() over the whole sheet.
+    """
+
+    def __init__(self, batch_size=200):
+        self.batch_size = batch_size
+        self.header = None
+        self.columns = {}
+        self.next_row = 2  # row 1 is the header
+        self.cycles = 0
+        self.rows_scanned_last_cycle = 0
+        self.rows_scanned_total = 0
+        self.range_reads = 0
+
+    def column(self, name):
+        """1-based column index of a header name, or None"""
+        index = self.columns.get(name)
+        return index + 1 if index is not None else None
+
+    def reset(self):
+        """Forget the cached header (e.g. after an API error or a sheet edit); keeps the high-water mark"""
+        self.header = None
+        self.columns = {}
+
+    def ensure_header(self, sheet):
+        """Read and cache the header row if it is not cached yet"""
+        if self.header is None:
+            self.header = sheet.row_values(1)
+            self.columns = {name: i for i, name in enumerate(self.header)}
+            self.range_reads += 1
+
+    def read_new_rows(self, sheet):
+        """Return [(row_number, record_dict)] for rows appended since the last advance()"""
+        self.ensure_header(sheet)
+        width = len(self.header)
+        rows = []
+        start = self.next_row
+        while True:
+            end = start + self.batch_size - 1
+            values = sheet.get(f"A{start}:{rowcol_to_a1(end, width)}")
+            self.range_reads += 1
+            for offset, raw in enumerate(values):
+                padded = list(raw) + [''] * (width - len(raw))
+                rows.append((start + offset, dict(zip(self.header, padded))))
+            # The API omits trailing empty rows, so a short page means we reached the end
+            if len(values) < self.batch_size:
+                break
+            start = end + 1
+
+        self.cycles += 1
+        self.rows_scanned_last_cycle = len(rows)
+        self.rows_scanned_total += len(rows)
+        return rows
+
+    def advance(self, rows):
+        """Move the high-water mark past rows that have been handled"""
+        if rows:
+            self.next_row = max(self.next_row, rows[-1][0] + 1)
+
+    def stats(self):
+        """Return the high-water mark and scan counters"""
+        return {
+            'next_row': self.next_row,
+            'cycles': self.cycles,
+            'rows_scanned_last_cycle': self.rows_scanned_last_cycle,
+            'rows_scanned_total': self.rows_scanned_total,
+            'range_reads': self.range_reads
+        }
+
+
+class BookingStatusWriter:
+    """Collects Status cell updates during a sync cycle and writes them in one batch_update
+
+    Updates that could not be flushed (quota still exhausted after the
+    retries, network error) stay pending and go out with the next cycle's
+    flush, so a row whose confirmation was sent is never left without a
+    status just because the write-back failed once.
+    """
+
+    def __init__(self, max_attempts=4, backoff_seconds=1.0, remember_rows=5000):
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.remember_rows = remember_rows
+        self._pending = {}
+        self._written = OrderedDict()
+        self.flush_latency = LatencyTracker()
+        self.flushes = 0
+        self.cells_written = 0
+        self.quota_retries = 0
+        self.failed_flushes = 0
+
+    def set(self, row_num, value):
+        """Queue a Status value for a sheet row (a later value for the same row wins)"""
+        self._pending[row_num] = value
+
+    def status_of(self, row_num):
+        """Status this process queued or recently wrote for row_num, or None"""
+        return self._pending.get(row_num) or self._written.get(row_num)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def flush(self, sheet, status_col):
+        """Write all queued updates in one request; returns the number of cells written"""
+        if not self._pending:
+            return 0
+        pending = dict(self._pending)
+        data = [
+            {'range': rowcol_to_a1(row_num, status_col), 'values': [[value]]}
+            for row_num, value in sorted(pending.items())
+        ]
+
+        started = time.monotonic()
+        for attempt in range(self.max_attempts):
+            try:
+                sheet.batch_update(data)
+                break
+            except APIError as e:
+                if e.code != 429 or attempt == self.max_attempts - 1:
+                    self.failed_flushes += 1
+                    raise
+                self.quota_retries += 1
+                # Sheets quota is per minute; back off exponentially with jitter
+                delay = self.backoff_seconds * (2 ** attempt) * (1 + random.random())
+                logging.warning(f"⏳ Sheets quota exceeded, retrying status write-back in {delay:.1f}s")
+                time.sleep(delay)
+        elapsed_ms = (time.monotonic() - started) * 1000
+        self.flush_latency.record(elapsed_ms)
+
+        for row_num, value in pending.items():
+            if self._pending.get(row_num) == value:
+                del self._pending[row_num]
+            # Remember it so a pushed row and the reconciliation scan never confirm twice
+            self._written[row_num] = value
+            self._written.move_to_end(row_num)
+        while len(self._written) > self.remember_rows:
+            self._written.popitem(last=False)
+        self.flushes += 1
+        self.cells_written += len(data)
+        logging.info(f"📝 Wrote {len(data)} booking statuses in one batch ({elapsed_ms:.0f} ms)")
+        return len(data)
+
+    def stats(self):
+        """Return pending count, flush counters and flush latency"""
+        return {
+            'pending': len(self._pending),
+            'flushes': self.flushes,
+            'cells_written': self.cells_written,
+            'quota_retries': self.quota_retries,
+            'failed_flushes': self.failed_flushes,
+            'flush_latency': self.flush_latency.snapshot()
+        }
+
+
+class ConfirmationDispatcher:
+    """Sends a batch of confirmations from a bounded thread pool at a capped message rate
+
+    Sends are paced to at most `rate_per_second` starts per second across all
+    workers, so a backlog drains in parallel without tripping Graph API
+    throttling. dispatch() blocks until the batch is done and returns the
+    per-row result.
+    """
+
+    def __init__(self, send_fn, workers=8, rate_per_second=20):
+        self.send_fn = send_fn
+        self.workers = workers
+        self.rate_per_second = rate_per_second
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='confirmations')
+        self._pace_lock = threading.Lock()
+        self._next_slot = 0.0
+        self.batches = 0
+        self.sent = 0
+        self.failed = 0
+        self.batch_latency = LatencyTracker()
+        self.last_batch_size = 0
+
+    def _wait_for_slot(self):
+        if self.rate_per_second <= 0:
+            return
+        with self._pace_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1.0 / self.rate_per_second
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _send(self, to, message):
+        self._wait_for_slot()
+        try:
+            return bool(self.send_fn(to, message))
+        except Exception as e:
+            logging.error(f"❌ Error sending booking confirmation to {to}: {e}")
+            return False
+
+    def dispatch(self, jobs):
+        """Send [(row_num, to, message)] and return {row_num: sent_ok}"""
+        if not jobs:
+            return {}
+        started = time.monotonic()
+        futures = [(row_num, self._pool.submit(self._send, to, message)) for row_num, to, message in jobs]
+        results = {row_num: future.result() for row_num, future in futures}
+        elapsed_ms = (time.monotonic() - started) * 1000
+
+        sent = sum(1 for ok in results.values() if ok)
+        self.batches += 1
+        self.sent += sent
+        self.failed += len(results) - sent
+        self.last_batch_size = len(jobs)
+        self.batch_latency.record(elapsed_ms)
+        if len(jobs) > 1:
+            logging.info(f"📤 Dispatched {len(jobs)} booking confirmations in {elapsed_ms:.0f} ms ({sent} sent)")
+        return results
+
+    def stats(self):
+        """Return pool size, rate limit, send counters and batch latency"""
+        return {
+            'workers': self.workers,
+            'rate_per_second': self.rate_per_second,
+            'batches': self.batches,
+            'sent': self.sent,
+            'failed': self.failed,
+            'last_batch_size': self.last_batch_size,
+            'batch_latency': self.batch_latency.snapshot()
+        }
+
+
+class BookingService:
+    """Confirms site visit bookings from the sheet, both pushed and found by the reconciliation poll
+
+    Pushed submissions run on their own small JobQueue so a long poll cycle
+    (dispatch pacing, Sheets backoff) never holds up chat workers; the lock
+    serializes them with the poll so no row is confirmed twice.
+    """
+
+    def __init__(self, sheets, sheet_name, send_fn, webhook_token=None, poll_interval=300, batch_size=200,
+                 status_max_attempts=4, dispatch_workers=8, dispatch_rate=20, push_workers=2, push_queue_size=500):
+        self.sheets = sheets
+        self.sheet_name = sheet_name
+        self.webhook_token = webhook_token
+        self.poll_interval = poll_interval
+        self.cursor = BookingSheetCursor(batch_size=batch_size)
+        self.status = BookingStatusWriter(max_attempts=status_max_attempts)
+        self.dispatcher = ConfirmationDispatcher(send_fn, workers=dispatch_workers, rate_per_second=dispatch_rate)
+        self.lock = threading.Lock()
+        self.push_queue = JobQueue('booking_push', workers=push_workers, max_size=push_queue_size)
+        self.push_latency = LatencyTracker()
+
+    @property
+    def push_enabled(self):
+        return bool(self.webhook_token)
+
+    def confirm(self, rows):
+        """Send confirmations for [(row_num, record)] rows without a status; returns how many were attempted"""
+        jobs = []
+        records = {}
+        for row_num, record in rows:
+            # New form submissions won't have a status; pushed rows are also remembered locally
+            if record.get('Status') or self.status.status_of(row_num):
+                continue
+
+            phone = normalize_phone(record.get('Phone'))
+            if phone and record.get('Name') and record.get('Preferred Date') and record.get('Preferred Time'):
+                jobs.append((row_num, phone, build_confirmation_message(record)))
+                records[row_num] = record
+
+        # Send in parallel at the configured rate; statuses are queued and written in one batch
+        results = self.dispatcher.dispatch(jobs)
+        for row_num, sent in results.items():
+            record = records[row_num]
+            if sent:
+                self.status.set(row_num, 'Confirmed')
+                logging.info(f"✅ Site visit confirmed for {record.get('Name')} on {record.get('Preferred Date')} at {record.get('Preferred Time')}")
+            else:
+                self.status.set(row_num, 'Pending - WhatsApp Failed')
+        return len(jobs)
+
+    def check_new_bookings(self):
+        """Confirm rows appended since the last check and write their statuses; returns False on errors"""
+        try:
+            sheet = self.sheets.worksheet(self.sheet_name)
+
+            # Read only the rows appended since the last cycle
+            rows = self.cursor.read_new_rows(sheet)
+            status_col = self.cursor.column('Status')
+
+            self.confirm(rows)
+
+            # Rows are handled once their messages are sent; a failed flush stays queued for next cycle
+            self.cursor.advance(rows)
+            self.status.flush(sheet, status_col)
+            logging.info(f"📋 Booking sync scanned {len(rows)} new rows (next row {self.cursor.next_row})")
+            return True
+
+        except Exception as e:
+            logging.error(f"Error checking new bookings: {e}")
+            # The sheet layout may have changed; re-read the header next cycle
+            self.cursor.reset()
+            self.sheets.handle_error(e)
+            return False
+
+    def confirm_pushed(self, row_num, record):
+        """Push worker job: confirm a pushed form submission unless the sheet already has its status, then write it"""
+        with self.lock:
+            started = time.monotonic()
+            try:
+                sheet = self.sheets.worksheet(self.sheet_name)
+                self.cursor.ensure_header(sheet)
+                status_col = self.cursor.column('Status')
+                # A retried push (e.g. after a restart) must not confirm twice; the sheet is the record of what was sent
+                record = dict(record, Status=read_row_status(sheet, row_num, status_col))
+            except Exception as e:
+                # Without the sheet a duplicate cannot be ruled out; the reconciliation check confirms the row instead
+                logging.error(f"Error reading pushed booking row {row_num}: {e}")
+                self.sheets.handle_error(e)
+                return
+            if not self.confirm([(row_num, record)]):
+                return
+            try:
+                self.status.flush(sheet, status_col)
+            except Exception as e:
+                # The status stays queued; the reconciliation check writes it later
+                logging.error(f"Error writing pushed booking status: {e}")
+                self.sheets.handle_error(e)
+            self.push_latency.record((time.monotonic() - started) * 1000)
+
+    def handle_push(self, token, payload):
+        """Authenticate and queue a pushed submission; returns (response body, HTTP status)"""
+        if not self.webhook_token:
+            return {'status': 'error', 'message': 'Booking push is not configured'}, 404
+
+        if not hmac.compare_digest((token or '').encode('utf-8'), self.webhook_token.encode('utf-8')):
+            logging.warning('❌ Booking push rejected: bad token')
+            return {'status': 'error', 'message': 'Forbidden'}, 403
+
+        try:
+            row_num, record = parse_booking_payload(payload)
+        except ValueError as e:
+            return {'status': 'error', 'message': str(e)}, 400
+
+        logging.info(f"📥 Booking pushed for sheet row {row_num}")
+        if not self.push_queue.submit(self.confirm_pushed, row_num, record):
+            # The sender retries; the reconciliation check is the backstop either way
+            return {'status': 'busy'}, 503
+        return {'status': 'accepted', 'row': row_num}, 202
+
+    def run_periodically(self):
+        """Check for new bookings every poll_interval seconds (hourly reconciliation when pushes are enabled)"""
+        while True:
+            try:
+                with self.lock:
+                    self.check_new_bookings()
+                time.sleep(self.poll_interval)
+            except Exception as e:
+                logging.error(f"Error in periodic booking check: {e}")
+                time.sleep(60)  # If error occurs, retry after 1 minute
+
+    def stats(self):
+        """Return the booking_* sections of /metrics"""
+        return {
+            'booking_sync': self.cursor.stats(),
+            'booking_status': self.status.stats(),
+            'booking_dispatch': self.dispatcher.stats(),
+            'booking_push': {
+                'enabled': self.push_enabled,
+                'poll_interval': self.poll_interval,
+                'queue': self.push_queue.stats(),
+                'latency': self.push_latency.snapshot()
+            }
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Post a fake form submission to /bookings/notify")
+    parser.add_argument('--url', default='http://localhost:5000', help="Bot base URL")
+    parser.add_argument('--token', required=True, help="BOOKING_WEBHOOK_TOKEN of the bot")
+    parser.add_argument('--row', type=int, required=True, help="Sheet row the submission landed in")
+    parser.add_argument('--name', default='Test Visitor')
+    parser.add_argument('--phone', required=True)
+    parser.add_argument('--date', default='Saturday')
+    parser.add_argument('--time', default='11:00 AM')
+    parser.add_argument('--unit', default='3BHK')
+    parser.add_argument('--budget', default='1.5 - 2 Cr')
+    args = parser.parse_args(argv)
+
+    import requests
+    payload = {
+        'row': args.row,
+        'values': {
+            'Name': [args.name], 'Phone': [args.phone], 'Preferred Date': [args.date],
+            'Preferred Time': [args.time], 'Unit Type': [args.unit], 'Budget': [args.budget]
+        }
+    }
+    response = requests.post(f"{args.url.rstrip('/')}/bookings/notify", json=payload,
+                             headers={'X-Booking-Token': args.token}, timeout=10)
+    print(response.status_code, response.text)
+    return 0 if response.ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
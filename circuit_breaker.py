@@ -0,0 +1,80 @@
+import time
+import logging
+import threading
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Stops calling an unhealthy dependency and probes it again after a cool-down
+
+    Closed: calls go through. After `failure_threshold` consecutive failures
+    the breaker opens and allow() returns False without touching the network.
+    Once `reset_timeout` seconds have passed it goes half-open and lets a
+    single probe through; a success closes it again, a failure reopens it.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_started = None
+        self.opened = 0
+        self.short_circuited = 0
+        self.probes = 0
+
+    def allow(self):
+        """Return True if a call may go out now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probe_started = None
+            if self.state == HALF_OPEN:
+                # One probe at a time; a probe that never reported back is replaced after reset_timeout
+                if self._probe_started is None or now - self._probe_started >= self.reset_timeout:
+                    self._probe_started = now
+                    self.probes += 1
+                    return True
+            self.short_circuited += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logging.info(f"✅ Circuit '{self.name}' closed again")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self._probe_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+                if self.state == CLOSED:
+                    logging.error(f"🔌 Circuit '{self.name}' opened after {self.consecutive_failures} consecutive failures")
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_started = None
+                self.opened += 1
+
+    def stats(self):
+        """Return state and counters"""
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout': self.reset_timeout,
+                'opened': self.opened,
+                'short_circuited': self.short_circuited,
+                'probes': self.probes
+            }
@@ -0,0 +1,173 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+
+SEGMENT_PATTERN = re.compile(r'^journal-(\d+)\.log$')
+
+
+class ConversationJournal:
+    """Append-only journal of conversation state writes with periodic compacted snapshots
+
+    Every saved state is appended as one JSON line to the current journal
+    segment. Compaction switches writes to a new segment, folds the previous
+    snapshot and the closed segments into a new snapshot (latest state per
+    user within the retention window), atomically replaces the snapshot and
+    deletes the folded segments. Replay loads the snapshot and then the
+    segments written after it; records are full states, so replaying one
+    twice is harmless.
+    """
+
+    def __init__(self, directory, snapshot_interval=300, retention_seconds=86400, fsync_interval=1.0):
+        self.directory = directory
+        self.snapshot_interval = snapshot_interval
+        self.retention_seconds = retention_seconds
+        self.fsync_interval = fsync_interval
+        self.snapshot_path = os.path.join(directory, 'snapshot.jsonl')
+        self._lock = threading.Lock()
+        self._file = None
+        self._seq = 0
+        self._synced_at = 0.0
+        self.records_written = 0
+        self.last_snapshot = {}
+        self.last_replay = {}
+        os.makedirs(directory, exist_ok=True)
+
+    # ===== REPLAY =====
+    def replay(self):
+        """Return {phone: state_dict} rebuilt from the snapshot and journal, then open a fresh segment"""
+        started = time.monotonic()
+        states, snapshot_records, journal_records, last_seq = self._fold(None)
+        with self._lock:
+            self._open_segment(last_seq + 1)
+        self.last_replay = {
+            'conversations': len(states),
+            'snapshot_records': snapshot_records,
+            'journal_records': journal_records,
+            'duration_ms': round((time.monotonic() - started) * 1000, 1)
+        }
+        return states
+
+    def _segments(self):
+        segments = []
+        for name in os.listdir(self.directory):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                segments.append((int(match.group(1)), os.path.join(self.directory, name)))
+        return sorted(segments)
+
+    def _fold(self, upto_seq):
+        """Fold snapshot + segments (optionally only those <= upto_seq) into the latest state per user"""
+        cutoff = time.time() - self.retention_seconds
+        states = {}
+        snapshot_records = 0
+        journal_records = 0
+        first_seq = 0
+
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline() or '{}')
+                first_seq = header.get('next_seq', 0)
+                for line in f:
+                    record = json.loads(line)
+                    states[record['p']] = record['s']
+                    snapshot_records += 1
+
+        last_seq = first_seq - 1
+        for seq, path in self._segments():
+            last_seq = max(last_seq, seq)
+            if seq < first_seq or (upto_seq is not None and seq > upto_seq):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-write; everything before it is intact
+                        logging.warning(f"Skipping corrupt journal line in {path}")
+                        continue
+                    states[record['p']] = record['s']
+                    journal_records += 1
+
+        states = {phone: state for phone, state in states.items() if state.get('last_active', 0) >= cutoff}
+        return states, snapshot_records, journal_records, last_seq
+
+    # ===== WRITES =====
+    def _open_segment(self, seq):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+        self._seq = seq
+        self._file = open(os.path.join(self.directory, f'journal-{seq}.log'), 'a', encoding='utf-8')
+
+    def record(self, phone, state_dict):
+        """Append one state write to the journal"""
+        line = json.dumps({'p': phone, 's': state_dict}, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            if self._file is None:
+                self._open_segment(self._seq)
+            self._file.write(line + '\n')
+            self._file.flush()
+            self.records_written += 1
+            now = time.monotonic()
+            if now - self._synced_at >= self.fsync_interval:
+                os.fsync(self._file.fileno())
+                self._synced_at = now
+
+    # ===== COMPACTION =====
+    def compact(self):
+        """Write a new snapshot covering every closed segment and delete those segments"""
+        started = time.monotonic()
+        with self._lock:
+            closed_seq = self._seq
+            self._open_segment(closed_seq + 1)
+
+        states, _, folded_records, _ = self._fold(closed_seq)
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'next_seq': closed_seq + 1, 'created_at': time.time()}) + '\n')
+            for phone, state in states.items():
+                f.write(json.dumps({'p': phone, 's': state}, ensure_ascii=False, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        for seq, path in self._segments():
+            if seq <= closed_seq:
+                os.remove(path)
+
+        self.last_snapshot = {
+            'conversations': len(states),
+            'folded_journal_records': folded_records,
+            'bytes': os.path.getsize(self.snapshot_path),
+            'duration_ms': round((time.monotonic() - started) * 1000, 1),
+            'at': time.time()
+        }
+        logging.info(f"📸 Conversation snapshot: {len(states)} conversations in {self.last_snapshot['duration_ms']} ms")
+
+    def start_compaction(self):
+        """Compact every snapshot_interval seconds on a daemon thread"""
+        def loop():
+            while True:
+                time.sleep(self.snapshot_interval)
+                try:
+                    self.compact()
+                except Exception as e:
+                    logging.error(f"Error compacting conversation journal: {e}")
+
+        threading.Thread(target=loop, name='conversation-journal', daemon=True).start()
+
+    def stats(self):
+        """Return journal configuration, write counters and the last snapshot/replay report"""
+        return {
+            'directory': self.directory,
+            'segment': self._seq,
+            'records_written': self.records_written,
+            'snapshot_interval': self.snapshot_interval,
+            'retention_seconds': self.retention_seconds,
+            'last_snapshot': self.last_snapshot,
+            'last_replay': self.last_replay
+        }
@@ -0,0 +1,350 @@
+import sys
+import copy
+import json
+import time
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+
+
+# Fields merged individually after a version conflict; only the ones this copy changed are re-applied
+MERGED_FIELDS = ('lead_capture_mode', 'user_phone', 'language', 'asked_about_brochure', 'booking_info')
+
+
+class ConversationState:
+    """Per-user conversation state with a bounded chat history"""
+
+    __slots__ = ('phone', 'chat_history', 'lead_capture_mode', 'user_phone', 'language',
+                 'asked_about_brochure', 'booking_info', 'last_active', 'version', 'pending_turns', '_baseline')
+
+    def __init__(self, phone, history_limit=20):
+        self.phone = phone
+        # Ring buffer of (message, is_user); the prompt only ever uses the last few turns
+        self.chat_history = deque(maxlen=history_limit)
+        self.lead_capture_mode = None
+        self.user_phone = phone
+        self.language = 'english'
+        self.asked_about_brochure = False
+        self.booking_info = {}
+        self.last_active = time.time()
+        # Store version this state was loaded at, and turns and field values since (not persisted)
+        self.version = 0
+        self.pending_turns = []
+        self._baseline = self._snapshot()
+
+    def add_turn(self, message, is_user):
+        """Append a message to the chat history"""
+        self.chat_history.append((message, is_user))
+        self.pending_turns.append((message, is_user))
+
+    def _snapshot(self):
+        # booking_info is edited in place, so it needs its own copy
+        return {name: copy.deepcopy(getattr(self, name)) for name in MERGED_FIELDS}
+
+    def mark_saved(self):
+        """Make the current values the baseline for detecting this copy's changes"""
+        self.pending_turns = []
+        self._baseline = self._snapshot()
+
+    def changed_fields(self):
+        """Names of the merged fields changed since this state was loaded or last saved"""
+        return [name for name in MERGED_FIELDS if getattr(self, name) != self._baseline[name]]
+
+    def merge_from(self, other):
+        """Re-apply another copy's changes on top of this (newer) state after a version conflict
+
+        Turns are appended; of the other fields only those the other copy
+        changed are taken, so updates saved meanwhile by another process survive.
+        """
+        for message, is_user in other.pending_turns:
+            self.add_turn(message, is_user)
+        for name in other.changed_fields():
+            setattr(self, name, copy.deepcopy(getattr(other, name)))
+        self.last_active = max(self.last_active, other.last_active)
+
+    def to_dict(self):
+        """Serializable form (without version bookkeeping)"""
+        return {
+            'chat_history': [list(turn) for turn in self.chat_history],
+            'lead_capture_mode': self.lead_capture_mode,
+            'user_phone': self.user_phone,
+            'language': self.language,
+            'asked_about_brochure': self.asked_about_brochure,
+            'booking_info': self.booking_info,
+            'last_active': self.last_active
+        }
+
+    @classmethod
+    def from_dict(cls, phone, data, history_limit=20):
+        state = cls(phone, history_limit)
+        state.chat_history.extend((message, is_user) for message, is_user in data.get('chat_history', []))
+        state.lead_capture_mode = data.get('lead_capture_mode')
+        state.user_phone = data.get('user_phone', phone)
+        state.language = data.get('language', 'english')
+        state.asked_about_brochure = data.get('asked_about_brochure', False)
+        state.booking_info = data.get('booking_info', {})
+        state.last_active = data.get('last_active', state.last_active)
+        state._baseline = state._snapshot()
+        return state
+
+    def approx_bytes(self):
+        """Rough memory footprint of this state including history strings"""
+        size = sys.getsizeof(self) + sys.getsizeof(self.chat_history) + sys.getsizeof(self.booking_info)
+        for message, _ in self.chat_history:
+            size += sys.getsizeof(message)
+        for value in self.booking_info.values():
+            size += sys.getsizeof(value)
+        return size
+
+
+class StateStore(ABC):
+    """Interface for conversation state backends
+
+    load(phone) returns a ConversationState carrying the version it was read
+    at; save(state) writes it only if nobody else saved a newer version in
+    the meantime and returns False on such a conflict.
+    """
+
+    conflicts = 0
+
+    @abstractmethod
+    def load(self, phone):
+        """Return the ConversationState for phone, creating a fresh one if none is stored"""
+
+    @abstractmethod
+    def save(self, state):
+        """Write state unless a newer version was saved meanwhile; returns False on a conflict"""
+
+    @abstractmethod
+    def stats(self):
+        """Return backend counters for /metrics"""
+
+    def commit(self, state, attempts=3):
+        """Save state, merging it onto the latest stored version on conflicts"""
+        for _ in range(attempts):
+            if self.save(state):
+                return True
+            self.conflicts += 1
+            latest = self.load(state.phone)
+            latest.merge_from(state)
+            state = latest
+        logging.error(f"❌ Could not save conversation for {state.phone} after {attempts} attempts")
+        return False
+
+
+class ConversationStore(StateStore):
+    """In-memory conversation store with LRU size limit and idle TTL eviction
+
+    Returns live objects, so saves always succeed; the KeyedExecutor already
+    serializes access per user inside one process. With a ConversationJournal
+    every save is journaled and restore() reloads states after a restart.
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=86400, history_limit=20, journal=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.history_limit = history_limit
+        self.journal = journal
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+
+    def restore(self):
+        """Reload conversations from the journal (oldest first, so LRU order is preserved)"""
+        if self.journal is None:
+            return 0
+        restored = self.journal.replay()
+        with self._lock:
+            for phone, data in sorted(restored.items(), key=lambda item: item[1].get('last_active', 0)):
+                state = ConversationState.from_dict(phone, data, self.history_limit)
+                state.version = 1
+                self._states[phone] = state
+                self._states.move_to_end(phone)
+            while len(self._states) > self.max_entries:
+                self._states.popitem(last=False)
+                self.evicted_lru += 1
+        return len(restored)
+
+    def load(self, phone):
+        """Return the state for phone, creating it if needed, and mark it as recently used"""
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            state = self._states.get(phone)
+            if state is None:
+                state = self._states[phone] = ConversationState(phone, self.history_limit)
+                while len(self._states) > self.max_entries:
+                    self._states.popitem(last=False)
+                    self.evicted_lru += 1
+            else:
+                self._states.move_to_end(phone)
+            state.last_active = now
+            return state
+
+    def save(self, state):
+        with self._lock:
+            if state.phone not in self._states:
+                # Re-inserting a state evicted since it was loaded must respect the size limit too
+                self._states[state.phone] = state
+                while len(self._states) > self.max_entries:
+                    self._states.popitem(last=False)
+                    self.evicted_lru += 1
+            state.version += 1
+            state.mark_saved()
+        if self.journal is not None:
+            self.journal.record(state.phone, state.to_dict())
+        return True
+
+    def _evict_idle(self, now):
+        # Entries are kept in access order, so expired ones are always at the front
+        while self._states:
+            phone, state = next(iter(self._states.items()))
+            if now - state.last_active <= self.ttl_seconds:
+                break
+            del self._states[phone]
+            self.evicted_idle += 1
+
+    def __contains__(self, phone):
+        with self._lock:
+            return phone in self._states
+
+    def __len__(self):
+        return len(self._states)
+
+    def stats(self):
+        """Return entry count, approximate memory use and eviction counters"""
+        with self._lock:
+            self._evict_idle(time.time())
+            states = list(self._states.values())
+        stats = {
+            'backend': 'memory',
+            'entries': len(states),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'history_limit': self.history_limit,
+            'approx_bytes': sum(state.approx_bytes() for state in states),
+            'evicted_idle': self.evicted_idle,
+            'evicted_lru': self.evicted_lru,
+            'conflicts': self.conflicts
+        }
+        if self.journal is not None:
+            stats['journal'] = self.journal.stats()
+        return stats
+
+
+class SQLiteConversationStore(StateStore):
+    """Conversation store in a WAL-mode SQLite file shared by several local processes
+
+    Every row carries a version; save() is a compare-and-swap on it, so two
+    workers updating the same user cannot silently overwrite each other.
+    """
+
+    CLEANUP_INTERVAL = 60
+
+    def __init__(self, path, max_entries=10000, ttl_seconds=86400, history_limit=20):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.history_limit = history_limit
+        self._local = threading.local()
+        self._cleaned_at = 0.0
+        self.evicted = 0
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS conversations (
+                phone TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                data TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS conversations_updated_at ON conversations (updated_at)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, phone):
+        row = self._conn().execute(
+            "SELECT version, data FROM conversations WHERE phone = ?", (phone,)
+        ).fetchone()
+        if row is None or time.time() - json.loads(row[1]).get('last_active', 0) > self.ttl_seconds:
+            state = ConversationState(phone, self.history_limit)
+            state.version = row[0] if row else 0
+        else:
+            state = ConversationState.from_dict(phone, json.loads(row[1]), self.history_limit)
+            state.version = row[0]
+        state.last_active = time.time()
+        return state
+
+    def save(self, state):
+        data = json.dumps(state.to_dict(), ensure_ascii=False)
+        now = time.time()
+        conn = self._conn()
+        if state.version == 0:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO conversations (phone, version, updated_at, data) VALUES (?, 1, ?, ?)",
+                (state.phone, now, data)
+            )
+        else:
+            cursor = conn.execute(
+                "UPDATE conversations SET version = version + 1, updated_at = ?, data = ? "
+                "WHERE phone = ? AND version = ?",
+                (now, data, state.phone, state.version)
+            )
+        if cursor.rowcount != 1:
+            return False
+        state.version += 1
+        state.mark_saved()
+        if now - self._cleaned_at > self.CLEANUP_INTERVAL:
+            self._cleanup(now)
+        return True
+
+    def _cleanup(self, now):
+        self._cleaned_at = now
+        conn = self._conn()
+        expired = conn.execute(
+            "DELETE FROM conversations WHERE updated_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        overflow = conn.execute(
+            "DELETE FROM conversations WHERE phone IN ("
+            "SELECT phone FROM conversations ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        ).rowcount
+        self.evicted += expired + overflow
+
+    def stats(self):
+        entries, approx_bytes = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(CAST(data AS BLOB))), 0) FROM conversations"
+        ).fetchone()
+        return {
+            'backend': 'sqlite',
+            'path': self.path,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'history_limit': self.history_limit,
+            'approx_bytes': approx_bytes,
+            'evicted': self.evicted,
+            'conflicts': self.conflicts
+        }
+
+
+def create_state_store(backend='memory', path='conversations.db', journal=None, **limits):
+    """Build the configured conversation state backend"""
+    if backend == 'sqlite':
+        if journal is not None:
+            logging.info("SQLite conversation store is already durable, journal not used")
+        return SQLiteConversationStore(path, **limits)
+    if backend != 'memory':
+        logging.warning(f"Unknown conversation store backend '{backend}', using memory")
+    return ConversationStore(journal=journal, **limits)
@@ -0,0 +1,95 @@
+import time
+import threading
+
+from metrics import LatencyTracker
+
+
+class Deadline:
+    """Time budget for handling one inbound message
+
+    Created when the webhook accepts the message and passed to every stage.
+    Stages shrink their timeouts to what is left (timeout()), skip retries
+    that cannot finish in time (allows()) and mark() how long they took.
+    """
+
+    __slots__ = ('budget', 'started', 'stages', '_marked_at')
+
+    def __init__(self, budget_seconds, started=None):
+        self.budget = budget_seconds
+        self.started = started if started is not None else time.monotonic()
+        self.stages = {}
+        self._marked_at = self.started
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        """Seconds left in the budget (negative once it is exceeded)"""
+        return self.budget - self.elapsed()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def allows(self, seconds, reserve=0.0):
+        """True if `seconds` of work still fits while keeping `reserve` seconds for later stages"""
+        return self.remaining() - reserve >= seconds
+
+    def timeout(self, cap, reserve=0.0, floor=0.0):
+        """A request timeout: at most `cap`, cut to the remaining budget minus `reserve`, never below `floor`"""
+        return max(floor, min(cap, self.remaining() - reserve))
+
+    def mark(self, stage):
+        """Record the time since the previous mark (or the start) under `stage`"""
+        now = time.monotonic()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._marked_at) * 1000
+        self._marked_at = now
+
+
+class DeadlineStats:
+    """Aggregates per-stage time and budget overruns across messages"""
+
+    def __init__(self, budget_seconds):
+        self.budget_seconds = budget_seconds
+        self._lock = threading.Lock()
+        self._stages = {}
+        self.total = LatencyTracker()
+        self.messages = 0
+        self.exceeded = 0
+        self.fallbacks = 0
+        self.skipped = {}
+
+    def skip(self, stage):
+        """Count a stage (or retry) skipped because the budget could not cover it"""
+        with self._lock:
+            self.skipped[stage] = self.skipped.get(stage, 0) + 1
+
+    def fallback(self):
+        """Count a reply replaced by the deterministic fallback because the budget ran out"""
+        with self._lock:
+            self.fallbacks += 1
+
+    def record(self, deadline):
+        """Fold one finished message's stage timings into the aggregates"""
+        with self._lock:
+            self.messages += 1
+            if deadline.expired():
+                self.exceeded += 1
+            trackers = [(self._stages.setdefault(stage, LatencyTracker()), ms) for stage, ms in deadline.stages.items()]
+        for tracker, ms in trackers:
+            tracker.record(ms)
+        self.total.record(deadline.elapsed() * 1000)
+
+    def stats(self):
+        """Return budget, overrun counters and per-stage latency"""
+        with self._lock:
+            stages = dict(self._stages)
+            stats = {
+                'budget_seconds': self.budget_seconds,
+                'messages': self.messages,
+                'exceeded': self.exceeded,
+                'fallbacks': self.fallbacks,
+                'skipped': dict(self.skipped)
+            }
+        stats['total'] = self.total.snapshot()
+        stats['stages'] = {stage: tracker.snapshot() for stage, tracker in stages.items()}
+        return stats
@@ -0,0 +1,266 @@
+import re
+import threading
+
+from intent_router import KeywordRouter
+
+# ===== FAST-PATH ROUTES =====
+# Fact intents answered straight from FAQ fields. Keywords are matched as substrings, like MESSAGE_ROUTES.
+FACT_ROUTES = {
+    'possession': ['possession', 'handover', 'completion date', 'when will it be ready', 'ready to move',
+                   'પઝેશન', 'કબજો'],
+    'address': ['address', 'site location', 'where is the site', 'where is brookstone', 'where is the project',
+                'સરનામું'],
+    'rera': ['rera registered', 'rera approved', 'is it rera', 'is brookstone rera', 'is the project rera',
+             'રેરા રજિસ્ટર્ડ', 'રેરા માન્ય'],
+    'towers': ['how many towers', 'number of towers', 'total towers', 'how many blocks', 'number of blocks',
+               'કેટલા ટાવર', 'કુલ ટાવર'],
+    'total_units': ['total units', 'how many units', 'number of units', 'how many flats', 'number of flats',
+                    'total flats', 'કુલ યુનિટ', 'કેટલા યુનિટ', 'કેટલા ફ્લેટ'],
+    'carpet_area': ['carpet', 'કાર્પેટ'],
+    'unit_size': ['unit size', 'flat size', 'size of', 'sqft', 'sq ft', 'square feet', 'super built', 'સાઇઝ'],
+    'price': ['price', 'cost', 'rate per', 'per sq', 'કિંમત', 'ભાવ'],
+}
+UNIT_ROUTES = {
+    '3BHK': ['3bhk', '3 bhk', 'three bhk', '3 બીએચકે'],
+    '4BHK': ['4bhk', '4 bhk', 'four bhk', '4 બીએચકે'],
+}
+
+# Words that make a question open-ended (advice, comparison, budget fit); those still go to Gemini
+OPEN_ENDED_WORDS = {
+    'why', 'compare', 'comparison', 'difference', 'better', 'best', 'suggest', 'recommend', 'explain', 'vs',
+    'versus', 'negotiable', 'negotiate', 'discount', 'emi', 'loan', 'offer', 'offers', 'budget', 'under',
+    'within', 'afford', 'worth', 'investment', 'if', 'but', 'should', 'which', 'other', 'nearby'
+}
+OPEN_ENDED_GUJARATI = ['કેમ', 'શા માટે', 'તફાવત', 'સરખામણી', 'સલાહ', 'શ્રેષ્ઠ', 'બજેટ', 'લોન', 'ઓફર', 'જો ']
+
+# Other subjects the fact keywords also fit ("maintenance cost", "kitchen size", "rera number");
+# a question naming one of them is not about the unit or project fact and goes to Gemini
+OTHER_SUBJECTS = re.compile(
+    r'\b(?:maintenance|parking|stamp|duty|registration|gst|tax|taxes|charge|charges|fee|fees|deposit|'
+    r'kitchen|bedroom|bedrooms|room|rooms|living|dining|hall|balcony|balconies|bathroom|bathrooms|toilet|'
+    r'terrace|lobby|garden|lift|lifts|gym|id)\b|\bnumber\b(?! of)|\b(?:tower|block) [a-z]\b'
+)
+OTHER_SUBJECTS_GUJARATI = ['મેન્ટેનન્સ', 'પાર્કિંગ', 'સ્ટેમ્પ', 'રજિસ્ટ્રેશન', 'રસોડું', 'બેડરૂમ', 'બાલ્કની', 'રૂમ', 'નંબર']
+# Unit facts (carpet area, size, price) are answered only when the question names a unit type or the project itself
+PROJECT_NOUNS = re.compile(r'\b(?:brookstone|project|flats?|apartments?|units?|homes?|property|properties)\b')
+PROJECT_NOUNS_GUJARATI = ['બ્રૂકસ્ટોન', 'પ્રોજેક્ટ', 'ફ્લેટ', 'યુનિટ']
+# Questions about what is close to the project need Gemini even when they mention the address
+PROXIMITY_WORDS = {'near', 'nearby', 'nearest', 'close', 'distance', 'far', 'km', 'school', 'schools', 'airport',
+                   'station', 'hospital', 'mall', 'highway'}
+PROXIMITY_GUJARATI = ['નજીક', 'અંતર', 'દૂર', 'શાળા', 'સ્કૂલ', 'એરપોર્ટ', 'સ્ટેશન', 'હોસ્પિટલ']
+# "towers and units" asks for two things; one template per question keeps replies complete
+CONJUNCTIONS = {'and', 'also', 'plus', '&', 'અને', 'તથા'}
+# Every word of a templated question must be a filler word, a unit type or part of a matched fact's vocabulary
+FILLER_WORDS = {
+    'what', 'whats', "what's", 'is', 'are', 'the', 'a', 'an', 'of', 'for', 'in', 'at', 'me', 'tell', 'please',
+    'pls', 'kindly', 'can', 'you', 'i', 'know', 'want', 'to', 'about', 'how', 'many', 'much', 'when', 'where',
+    'will', 'be', 'it', 'its', 'this', 'there', 'does', 'do', 'give', 'share', 'your', 'brookstone', 'project',
+    'flat', 'flats', 'apartment', 'apartments', 'unit', 'units', 'home', 'homes', 'property', 'number', 'total',
+    'શું', 'છે', 'કેટલા', 'કેટલી', 'કેટલું', 'કેટલો', 'ક્યારે', 'ક્યાં', 'મને', 'જણાવો', 'આપો', 'કૃપા', 'કરીને',
+    'નું', 'ની', 'ના', 'નો', 'માં', 'કુલ', 'બ્રૂકસ્ટોન', 'પ્રોજેક્ટ', 'ફ્લેટ', 'યુનિટ'
+}
+UNIT_WORDS = {'3bhk', '4bhk', '3', '4', 'bhk', 'three', 'four', 'બીએચકે'}
+FACT_WORDS = {
+    'possession': {'possession', 'handover', 'completion', 'date', 'ready', 'move', 'expected', 'timeline',
+                   'પઝેશન', 'કબજો', 'મળશે'},
+    'address': {'address', 'location', 'site', 'located', 'exact', 'full', 'સરનામું', 'સાઇટ'},
+    'rera': {'rera', 'registered', 'approved', 'રેરા', 'રજિસ્ટર્ડ', 'માન્ય'},
+    'towers': {'towers', 'tower', 'blocks', 'block', 'ટાવર'},
+    'total_units': {'units', 'flats', 'યુનિટ', 'ફ્લેટ'},
+    'carpet_area': {'carpet', 'area', 'કાર્પેટ', 'એરિયા'},
+    'unit_size': {'size', 'sizes', 'sqft', 'sq', 'ft', 'square', 'feet', 'super', 'built', 'up', 'builtup',
+                  'area', 'સાઇઝ'},
+    'price': {'price', 'prices', 'cost', 'rate', 'per', 'sq', 'sqft', 'ft', 'square', 'feet', 'કિંમત', 'ભાવ', 'દર'},
+}
+# "price per sqft" asks for the rate, not the unit size
+RATE_PHRASE = re.compile(r'\bper (?:sq|square)')
+GUJARATI_DIGITS = str.maketrans('૦૧૨૩૪૫૬૭૮૯', '0123456789')
+MAX_QUESTION_WORDS = 14
+MAX_FACTS = 3
+
+# ===== TEMPLATES =====
+TEMPLATES = {
+    'english': {
+        'possession': "🏗️ Possession of Brookstone is expected by *{possession_date}*.",
+        'address': "📍 *Site address:*\n{site_address}",
+        'rera': "✅ RERA registered: *{rera_registered}*",
+        'towers': "🏢 Brookstone has *{towers}* towers.",
+        'total_units': "🏠 Brookstone has *{total_units}* units in total.",
+        'carpet_area': "📐 *Carpet area:*",
+        'carpet_area_line': "• *{type}*: {carpet_area}",
+        'unit_size': "📏 *Unit size:*",
+        'unit_size_line': "• *{type}*: {size_sqft} ({size_sq_yard})",
+        'price': "💰 *Price:*",
+        'price_line': "• *{type}* ({size_sqft}): {price_cr}",
+        'price_rate': "Rate: {price_per_sqft}",
+        'closing': "Would you like the brochure or to book a site visit? 😊",
+    },
+    'gujarati': {
+        'possession': "🏗️ બ્રૂકસ્ટોનનું પઝેશન *{possession_date}* સુધીમાં અપેક્ષિત છે.",
+        'address': "📍 *સાઇટનું સરનામું:*\n{site_address}",
+        'rera': "✅ RERA રજિસ્ટર્ડ: *{rera_registered}*",
+        'towers': "🏢 બ્રૂકસ્ટોનમાં કુલ *{towers}* ટાવર છે.",
+        'total_units': "🏠 બ્રૂકસ્ટોનમાં કુલ *{total_units}* યુનિટ છે.",
+        'carpet_area': "📐 *કાર્પેટ એરિયા:*",
+        'carpet_area_line': "• *{type}*: {carpet_area}",
+        'unit_size': "📏 *યુનિટ સાઇઝ:*",
+        'unit_size_line': "• *{type}*: {size_sqft} ({size_sq_yard})",
+        'price': "💰 *કિંમત:*",
+        'price_line': "• *{type}* ({size_sqft}): {price_cr}",
+        'price_rate': "દર: {price_per_sqft}",
+        'closing': "શું તમે બ્રોશર મેળવવા અથવા સાઇટ વિઝિટ બુક કરવા માંગો છો? 😊",
+    },
+}
+PROJECT_FIELDS = {
+    'possession': ['possession_date'],
+    'address': ['site_address'],
+    'rera': ['rera_registered'],
+    'towers': ['towers'],
+    'total_units': ['total_units'],
+}
+UNIT_FIELDS = {
+    'carpet_area': ['carpet_area'],
+    'unit_size': ['size_sqft', 'size_sq_yard'],
+    'price': ['size_sqft', 'price_cr'],
+}
+
+
+def _known(value):
+    return value not in (None, '', 'TBD')
+
+
+class FaqAnswerEngine:
+    """Answers short factual questions from FAQ fields with fixed bilingual templates
+
+    A question qualifies only if it is short, contains no open-ended or
+    proximity wording, names no other subject (maintenance, parking, a room,
+    a RERA number ...), matches between one and MAX_FACTS fact intents whose
+    fields are all filled in (only one if it joins requests with "and"), and
+    every word is covered by a matched fact, a unit type or a filler word.
+    Unit facts also need a unit type or the project named. Everything else
+    returns None and goes to Gemini.
+    """
+
+    def __init__(self, faq_data):
+        self.fact_router = KeywordRouter(FACT_ROUTES)
+        self.unit_router = KeywordRouter(UNIT_ROUTES)
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.by_intent = {}
+        self.load(faq_data)
+
+    def load(self, faq_data):
+        """(Re)read the FAQ fields the templates use; counters are kept"""
+        fields = {}
+        for language, lang_data in faq_data.items():
+            units = {
+                unit.get('type'): unit for unit in lang_data.get('unit_configurations', []) if unit.get('type')
+            }
+            fields[language] = {
+                'project': lang_data.get('project_info', {}),
+                'pricing': lang_data.get('pricing', {}),
+                'units': units
+            }
+        self._fields = fields
+
+    def _is_open_ended(self, text):
+        words = re.findall(r'[a-z]+', text)
+        if len(text.split()) > MAX_QUESTION_WORDS:
+            return True
+        if OPEN_ENDED_WORDS.intersection(words):
+            return True
+        return any(marker in text for marker in OPEN_ENDED_GUJARATI)
+
+    def _names_other_subject(self, text):
+        return bool(OTHER_SUBJECTS.search(text)) or any(marker in text for marker in OTHER_SUBJECTS_GUJARATI)
+
+    def _asks_about_surroundings(self, words, text):
+        return bool(PROXIMITY_WORDS.intersection(words)) or any(marker in text for marker in PROXIMITY_GUJARATI)
+
+    @staticmethod
+    def _uncovered_words(words, intents):
+        """Words the matched facts do not explain; Gujarati suffixes (નું, માં ...) are allowed after a known stem"""
+        vocabulary = FILLER_WORDS | UNIT_WORDS
+        for intent in intents:
+            vocabulary = vocabulary | FACT_WORDS[intent]
+        stems = [word for word in vocabulary if len(word) >= 3]
+        return [
+            word for word in words
+            if word not in vocabulary and not any(word.startswith(stem) for stem in stems)
+        ]
+
+    def _names_project(self, text):
+        return bool(PROJECT_NOUNS.search(text)) or any(marker in text for marker in PROJECT_NOUNS_GUJARATI)
+
+    def _render(self, intent, language, fields, unit_types):
+        templates = TEMPLATES[language]
+        if intent in PROJECT_FIELDS:
+            values = {name: fields['project'].get(name) for name in PROJECT_FIELDS[intent]}
+            if not all(_known(value) for value in values.values()):
+                return None
+            return templates[intent].format(**values)
+
+        units = fields['units']
+        types = [unit_type for unit_type in UNIT_ROUTES if unit_type in unit_types] or list(units)
+        lines = [templates[intent]]
+        for unit_type in types:
+            unit = units.get(unit_type)
+            if unit is None or not all(_known(unit.get(name)) for name in UNIT_FIELDS[intent]):
+                return None
+            lines.append(templates[f'{intent}_line'].format(**unit))
+        if intent == 'price':
+            rate = fields['pricing'].get('price_per_sqft')
+            if _known(rate):
+                lines.append(templates['price_rate'].format(price_per_sqft=rate))
+        return '\n'.join(lines)
+
+    def answer(self, question, language='english'):
+        """Return a templated reply, or None when the question needs Gemini"""
+        text = question.lower().strip().translate(GUJARATI_DIGITS)
+        words = re.findall(r"[^\s?!.,;:()]+", text)
+        with self._lock:
+            self.lookups += 1
+
+        language = language if language in TEMPLATES else 'english'
+        fields = self._fields.get(language) or self._fields.get('english')
+        if fields is None or self._is_open_ended(text) or self._names_other_subject(text):
+            return None
+        if self._asks_about_surroundings(words, text):
+            return None
+        intents = set(self.fact_router.match(text))
+        if 'price' in intents and RATE_PHRASE.search(text):
+            intents.discard('unit_size')
+        if not intents or len(intents) > MAX_FACTS:
+            return None
+        if len(intents) > 1 and CONJUNCTIONS.intersection(words):
+            return None
+        if self._uncovered_words(words, intents):
+            return None
+
+        unit_types = self.unit_router.match(text)
+        if not unit_types and not self._names_project(text) and any(intent in UNIT_FIELDS for intent in intents):
+            return None
+        parts = []
+        for intent in FACT_ROUTES:
+            if intent in intents:
+                part = self._render(intent, language, fields, unit_types)
+                if part is None:
+                    return None
+                parts.append(part)
+
+        with self._lock:
+            self.hits += 1
+            for intent in intents:
+                self.by_intent[intent] = self.by_intent.get(intent, 0) + 1
+        return '\n\n'.join(parts + [TEMPLATES[language]['closing']])
+
+    def stats(self):
+        """Return lookup/hit counters and hits per fact intent"""
+        with self._lock:
+            return {
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'hit_rate': round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+                'by_intent': dict(self.by_intent)
+            }
@@ -0,0 +1,186 @@
+from prompt_encoding import encode_fragment, join_fragments
+
+# Hand-curated ground floor zone details (English in both languages, as before)
+BLOCK_A_ZONE_DETAILS = {
+    'foyer': {
+        'size': '14\'-9\" × 14\'-6\"',
+        'function': 'Entry point into Block A',
+        'features': 'Staircases (UP & DN) on both sides'
+    },
+    'lift_lobby': {
+        'size': '8\'-5\" × 6\'-8\"',
+        'lifts_count': '2 lifts'
+    },
+    'seating_space': {
+        'size': '44\'-0\" × 21\'-7\"',
+        'function': 'Large sitting lounge outside Block A'
+    },
+    'society_office': {
+        'size': '10\'-3\" × 16\'-3\"',
+        'location': 'Beside the seating lounge'
+    },
+    'store_society': {
+        'size': '10\'-3\" × 5\'-0\"',
+        'location': 'Near the Society Office'
+    },
+    'toddlers_space': {
+        'size': '16\'-4\" × 15\'-9\"',
+        'function': 'Play area for toddlers'
+    },
+    'store_toddlers': {
+        'size': '11\'-0\" × 5\'-7\"',
+        'location': 'Near the Toddler\'s Space'
+    },
+    'toilet_toddlers': {
+        'size': '6\'-0\" × 6\'-7\"',
+        'location': 'Near the Toddler\'s Space'
+    },
+    'other_utilities': {
+        'security': 'Security Cabin with toilet at entry/exit gate',
+        'meter_room': 'Dedicated space for electrical meters',
+        'parking': 'Car parking spaces available',
+        'drop_off': 'Kids drop-off area',
+        'ramp': 'Basement ramp near Block A foyer',
+        'water_feature': 'Decorative water body beside walkway'
+    }
+}
+
+BLOCK_B_ZONE_DETAILS = {
+    'foyer': {
+        'size': '14\'-0\" × 19\'-6\"',
+        'function': 'Entry point into Block B',
+        'features': 'Staircases (UP & DN) on both sides'
+    },
+    'lift_lobby': {
+        'size': '6\'-8\" × 8\'-0\"',
+        'lifts_count': '2 lifts'
+    },
+    'gym': {
+        'size': '17\'-9\" × 19\'-3\"',
+        'function': 'Fitness and exercise area'
+    },
+    'library_lounge': {
+        'size': '18\'-9\" × 26\'-5\"',
+        'function': 'Library, Lounge, and Multi-Purpose Room'
+    },
+    'other_utilities': {
+        'sand_pit': 'Children\'s play area',
+        'postal': 'Dedicated space for postal services'
+    }
+}
+
+CENTRAL_AMENITIES_DETAILS = {
+    'multipurpose_court': {
+        'size': '40\'-8\" × 18\'-11\"',
+        'location': 'Center of complex',
+        'features': 'Surrounded by walkways'
+    },
+    'sand_pit': {
+        'location': 'Adjacent to multipurpose court',
+        'function': 'Children\'s play area'
+    },
+    'other_facilities': [
+        'Internal Roads',
+        'Drop-Off Plaza',
+        'Lawn Area',
+        'DG Set',
+        'Seating Blocks',
+        'Ramp Down to Basement',
+        'Water Fountain with sculpture'
+    ]
+}
+
+
+def _unit_summary(configs, unit_type):
+    config = next((c for c in configs if c.get('type') == unit_type), {})
+    return {
+        'total_size': config.get('size_sqft', ''),
+        'carpet_area': config.get('carpet_area', ''),
+        'size_yard': config.get('size_sq_yard', ''),
+        'price': config.get('price_cr', '')
+    }
+
+
+def _plan_details(plan):
+    return {
+        'overview': plan['overview'],
+        'special_features': plan['special_features'],
+        'area_breakdown': plan['area_breakdown']
+    }
+
+
+def build_sections(lang_data):
+    """Build every prompt section and projection for one language"""
+    sections = {}
+
+    # Whole top-level sections are used as-is
+    for name, value in lang_data.items():
+        sections[name] = value
+
+    ground_floor = lang_data.get('ground_floor_plan')
+    if ground_floor is not None:
+        sections['ground_floor_summary'] = ground_floor.get('summary', '')
+        sections['ground_floor_overview'] = ground_floor.get('site_overview', {})
+        sections['block_a_zone'] = BLOCK_A_ZONE_DETAILS
+        sections['block_b_zone'] = BLOCK_B_ZONE_DETAILS
+        sections['central_amenities'] = CENTRAL_AMENITIES_DETAILS
+        sections['elevators_detail'] = {
+            'block_a': ground_floor['block_a_zone'].get('lift_lobby', {}),
+            'block_b': ground_floor['block_b_zone'].get('lift_lobby', {})
+        }
+
+    if 'unit_configurations' in lang_data:
+        configs = lang_data['unit_configurations']
+        sections['unit_details'] = {
+            '3bhk': _unit_summary(configs, '3BHK'),
+            '4bhk': _unit_summary(configs, '4BHK')
+        }
+
+    if '3bhk_unit_plan' in lang_data:
+        sections['3bhk_details'] = _plan_details(lang_data['3bhk_unit_plan'])
+    if '4bhk_unit_plan' in lang_data:
+        sections['4bhk_details'] = _plan_details(lang_data['4bhk_unit_plan'])
+
+    specifications = lang_data.get('construction_specifications')
+    if specifications is not None:
+        sections['specifications'] = specifications
+        if 'elevator' in specifications:
+            sections['elevator'] = specifications['elevator']
+
+    return sections
+
+
+class PromptFragments:
+    """FAQ sections and projections built once per language and stored pre-serialized
+
+    extract_relevant_data picks section objects from here, and the prompt is
+    assembled by joining their cached encodings; only data that is not a
+    precompiled section (e.g. BM25 chunks) is serialized per request.
+    """
+
+    def __init__(self, faq_data, mode='compact'):
+        self.mode = mode
+        self._sections = {}
+        self._encoded = {}
+        for language, lang_data in faq_data.items():
+            sections = build_sections(lang_data)
+            self._sections[language] = sections
+            self._encoded[language] = {
+                name: (value, encode_fragment(name, value, mode)) for name, value in sections.items()
+            }
+
+    def sections(self, language):
+        """Return {name: value} for a language, falling back to English"""
+        return self._sections.get(language) or self._sections.get('english', {})
+
+    def render(self, language, relevant_data):
+        """Serialize relevant_data, reusing the cached encoding of every precompiled section"""
+        encoded = self._encoded.get(language) or self._encoded.get('english', {})
+        parts = []
+        for name, value in relevant_data.items():
+            cached = encoded.get(name)
+            if cached is not None and cached[0] is value:
+                parts.append(cached[1])
+            else:
+                parts.append(encode_fragment(name, value, self.mode))
+        return join_fragments(parts, self.mode)
@@ -0,0 +1,108 @@
+import re
+import math
+from collections import Counter
+
+GUJARATI_DIGITS = str.maketrans('૦૧૨૩૪૫૬૭૮૯', '0123456789')
+
+# Latin words, numbers (3bhk -> 3, bhk) and runs of Gujarati script (letters, matras, virama)
+TOKEN_PATTERN = re.compile(r'[a-z]+|\d+(?:\.\d+)?|[\u0A80-\u0AFF]+')
+
+# Common Gujarati postpositions glued to the noun ("પાર્કિંગની", "રસોડામાં")
+GUJARATI_SUFFIXES = ('માંથી', 'માં', 'નાં', 'નો', 'ની', 'નું', 'ના', 'ને', 'થી', 'એ')
+
+ENGLISH_STOPWORDS = {
+    'the', 'a', 'an', 'is', 'are', 'of', 'in', 'on', 'for', 'to', 'and', 'or', 'what', 'which',
+    'how', 'much', 'many', 'do', 'does', 'there', 'it', 'its', 'me', 'i', 'you', 'your', 'about',
+    'tell', 'please', 'with', 'any', 'this', 'that', 'be', 'can', 'will', 'available'
+}
+
+GUJARATI_STOPWORDS = {
+    'ની', 'નો', 'નું', 'ના', 'ને', 'માં', 'છે', 'શું', 'અને', 'કે', 'આ', 'તે', 'કેટલી', 'કેટલું', 'કેટલા',
+    'કયા', 'કઈ', 'કોણ', 'મને', 'વિશે', 'જણાવો', 'કહો', 'હું', 'તમે', 'પણ'
+}
+
+
+def tokenize(text):
+    """Split English and Gujarati text into normalized search terms"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower().translate(GUJARATI_DIGITS)):
+        if token in ENGLISH_STOPWORDS or token in GUJARATI_STOPWORDS:
+            continue
+        if '\u0A80' <= token[0] <= '\u0AFF':
+            for suffix in GUJARATI_SUFFIXES:
+                if token.endswith(suffix) and len(token) > len(suffix) + 1:
+                    token = token[:-len(suffix)]
+                    break
+        elif len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def flatten_faq(data, path=''):
+    """Yield (json_path, text) for every leaf value in the FAQ JSON"""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield from flatten_faq(value, f"{path}.{key}" if path else key)
+    elif isinstance(data, list):
+        if all(isinstance(item, str) for item in data):
+            yield path, ', '.join(data)
+        else:
+            for i, item in enumerate(data):
+                yield from flatten_faq(item, f"{path}[{i}]")
+    elif data not in (None, ''):
+        yield path, str(data)
+
+
+class FaqIndex:
+    """BM25 index over leaf-level FAQ chunks for one language"""
+
+    def __init__(self, lang_data, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.chunks = []
+        self._postings = {}
+        self._lengths = []
+
+        for path, text in flatten_faq(lang_data):
+            # Path words ("3bhk_unit_plan.room_details.kitchen") make English queries hit Gujarati values too
+            terms = tokenize(path.replace('_', ' ').replace('.', ' ')) + tokenize(text)
+            doc_id = len(self.chunks)
+            self.chunks.append((path, text, len(path.encode('utf-8')) + len(text.encode('utf-8'))))
+            self._lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self._postings.setdefault(term, []).append((doc_id, tf))
+
+        doc_count = len(self.chunks)
+        self._avg_length = (sum(self._lengths) / doc_count) if doc_count else 0.0
+        self._idf = {
+            term: math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def search(self, query, top_k=12, byte_budget=3000):
+        """Return up to top_k (path, text) chunks by BM25 score that fit within byte_budget"""
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf[term]
+            for doc_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / self._avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        results = []
+        used = 0
+        for doc_id in sorted(scores, key=scores.get, reverse=True)[:top_k]:
+            path, text, size = self.chunks[doc_id]
+            if used + size > byte_budget:
+                continue
+            results.append((path, text))
+            used += size
+        return results
+
+
+def build_faq_indexes(faq_data):
+    """Build one FaqIndex per language"""
+    return {language: FaqIndex(lang_data) for language, lang_data in faq_data.items()}
@@ -0,0 +1,509 @@
+"""Gemini answer path: FAQ data, retrieval, prompt building, model routing and the answer cache
+
+whatsapp_bot.py and warm_cache.py both build a GeminiAnswerService with
+create_answer_service(), so warm answers come from exactly the same
+retrieval, prompts, model tiers and cache keys as live ones, without the
+warm job importing the bot (and with it the webhook, conversation journal
+and booking threads).
+"""
+import os
+import re
+import json
+import time
+import logging
+import threading
+
+import requests
+
+from answer_cache import AnswerCache, faq_content_hash, normalize_question, is_cacheable_question
+from metrics import LatencyTracker
+from single_flight import SingleFlight
+from model_router import ModelRouter, ModelTier, ThinkingBudgets
+from intent_router import KeywordRouter, MESSAGE_ROUTES
+from faq_index import build_faq_indexes
+from faq_fragments import PromptFragments
+from faq_answers import FaqAnswerEngine
+
+FAQ_FILES = {
+    'english': 'faq_data_english.json',
+    'gujarati': 'faq_data_gujarati.json'
+}
+
+GEMINI_NOT_CONFIGURED_REPLY = "⚠️ Please configure your Gemini API key"
+GEMINI_ERROR_REPLY = "Sorry, I'm having trouble answering right now. Please try again or contact our agent at +91 1234567890."
+
+
+def load_faq_data(faq_files=FAQ_FILES):
+    """Load FAQ data from JSON files for both languages"""
+    data = {}
+    for language, path in faq_files.items():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data[language] = json.load(f)
+        except Exception as e:
+            logging.error(f"Error loading {language.title()} FAQ: {e}")
+            data[language] = {}
+    return data
+
+
+def select_faq_sections(intents):
+    """Names of the precompiled FAQ sections to send for the matched intents, in prompt order"""
+    names = ['project_info']
+
+    # Ground floor summary plus zone-specific details
+    if 'ground_floor' in intents:
+        names += ['ground_floor_summary', 'ground_floor_overview']
+        if 'block_a_zone' in intents:
+            names.append('block_a_zone')
+        if 'block_b_zone' in intents:
+            names.append('block_b_zone')
+        if 'central_amenities' in intents:
+            names.append('central_amenities')
+
+    # Unit configurations and sizes (both configurations), detailed plans on request
+    if 'unit_details' in intents:
+        names.append('unit_details')
+        if '3bhk_details' in intents:
+            names.append('3bhk_details')
+        if '4bhk_details' in intents:
+            names.append('4bhk_details')
+        names.append('pricing')
+
+    if 'unit_plans' in intents:
+        names += ['3bhk_unit_plan', '4bhk_unit_plan']
+    if 'parking' in intents:
+        names.append('parking')
+    if 'elevator' in intents:
+        names += ['elevator', 'elevators_detail']
+    if 'specifications' in intents:
+        names.append('specifications')
+    if 'amenities' in intents:
+        names.append('amenities')
+    if 'location' in intents:
+        names.append('location_details')
+    if 'possession' in intents:
+        names.append('possession_details')
+    if 'developer' in intents:
+        names.append('developer_portfolio')
+
+    return names
+
+
+def _fact_label(path):
+    """Readable label for a flattened FAQ path, e.g. 'parking.parking_type' -> 'Parking Type'"""
+    parts = [part for part in re.split(r'[.\[\]]', path) if part and not part.isdigit()]
+    return parts[-1].replace('_', ' ').title() if parts else path
+
+
+class GeminiAnswerService:
+    """Answers general questions from FAQ templates, the answer cache or Gemini
+
+    Holds the FAQ data and everything derived from it (BM25 indexes, prompt
+    fragments, templates), reloading them when the FAQ files change. Misses
+    go to Gemini through the model router, with identical concurrent
+    questions coalesced into one call. `deadline_stats` (optional) counts
+    Gemini attempts skipped because a message's deadline ran out.
+    """
+
+    def __init__(self, api_key, cache, model_router, thinking_budgets, faq_files=FAQ_FILES, coalesce_timeout=35,
+                 retrieval='keywords', retrieval_top_k=12, retrieval_byte_budget=3000, prompt_encoding='compact',
+                 fallback_facts=3, reload_check_seconds=30, min_attempt_seconds=3, send_reserve_seconds=5,
+                 deadline_stats=None):
+        self.api_key = api_key
+        self.cache = cache
+        self.model_router = model_router
+        self.thinking_budgets = thinking_budgets
+        self.faq_files = faq_files
+        self.retrieval = retrieval
+        self.retrieval_top_k = retrieval_top_k
+        self.retrieval_byte_budget = retrieval_byte_budget
+        self.prompt_encoding = prompt_encoding
+        self.fallback_facts = fallback_facts
+        self.reload_check_seconds = reload_check_seconds
+        self.min_attempt_seconds = min_attempt_seconds
+        self.send_reserve_seconds = send_reserve_seconds
+        self.coalesce_timeout = coalesce_timeout
+        self.deadline_stats = deadline_stats
+        self.router = KeywordRouter(MESSAGE_ROUTES)
+        self.latency = LatencyTracker()
+        self.flights = SingleFlight(timeout=coalesce_timeout)
+
+        self.faq_data = load_faq_data(faq_files)
+        self.faq_version = faq_content_hash(faq_files.values())
+        self.faq_index = build_faq_indexes(self.faq_data)
+        self.fragments = PromptFragments(self.faq_data, mode=prompt_encoding)
+        self.templates = FaqAnswerEngine(self.faq_data)
+        self.cache.set_faq_version(self.faq_version)
+        self._reload_lock = threading.Lock()
+        self._mtimes = self._faq_file_mtimes()
+        self._checked_at = 0.0
+
+    # ===== FAQ RELOAD =====
+    def _faq_file_mtimes(self):
+        mtimes = {}
+        for path in self.faq_files.values():
+            try:
+                mtimes[path] = os.stat(path).st_mtime
+            except OSError:
+                mtimes[path] = None
+        return mtimes
+
+    def refresh_faq_data(self):
+        """Reload the FAQ JSON (and invalidate cached answers) when its content has changed"""
+        if time.monotonic() - self._checked_at < self.reload_check_seconds:
+            return
+        with self._reload_lock:
+            if time.monotonic() - self._checked_at < self.reload_check_seconds:
+                return
+            self._checked_at = time.monotonic()
+
+            mtimes = self._faq_file_mtimes()
+            if mtimes == self._mtimes:
+                return
+            self._mtimes = mtimes
+
+            version = faq_content_hash(self.faq_files.values())
+            if version == self.faq_version:
+                return
+
+            self.faq_data = load_faq_data(self.faq_files)
+            self.faq_index = build_faq_indexes(self.faq_data)
+            self.fragments = PromptFragments(self.faq_data, mode=self.prompt_encoding)
+            self.templates.load(self.faq_data)
+            self.faq_version = version
+            self.cache.set_faq_version(version)
+            logging.info(f"🔄 FAQ data changed (version {version}), answer cache invalidated")
+
+    # ===== RETRIEVAL AND PROMPTS =====
+    def extract_relevant_data(self, user_question, language='english', intents=None):
+        """Extract only relevant data based on user question to reduce API payload"""
+        # Sections are precompiled per language from the FAQ data; nothing is rebuilt or copied per message
+        sections = self.fragments.sections(language)
+        relevant_data = {}
+        if intents is None:
+            intents = self.router.match(user_question)
+
+        if self.retrieval == 'bm25':
+            if 'project_info' in sections:
+                relevant_data['project_info'] = sections['project_info']
+            relevant_data.update(self.retrieve_faq_chunks(user_question, language))
+            return relevant_data
+
+        for name in select_faq_sections(intents):
+            if name in sections:
+                relevant_data[name] = sections[name]
+
+        # If minimal data, add the best matching FAQ chunks rather than whole sections
+        if len(relevant_data) <= 2:
+            chunks = self.retrieve_faq_chunks(user_question, language)
+            if chunks:
+                relevant_data.update(chunks)
+            else:
+                # Nothing to go on (e.g. a greeting): give a compact overview
+                for section in ['unit_configurations', 'pricing', 'amenities', 'location_details']:
+                    if section in sections:
+                        relevant_data[section] = sections[section]
+
+        return relevant_data
+
+    def retrieve_faq_chunks(self, user_question, language='english'):
+        """Top BM25 leaf chunks as {json_path: text}, bounded by the retrieval byte budget"""
+        index = self.faq_index.get(language) or self.faq_index.get('english')
+        if index is None:
+            return {}
+        return dict(index.search(user_question, top_k=self.retrieval_top_k, byte_budget=self.retrieval_byte_budget))
+
+    def create_prompt(self, user_question, language='english', chat_history=None, relevant_data=None):
+        """Create an optimized prompt for Gemini with only relevant data and conversation context"""
+        if relevant_data is None:
+            relevant_data = self.extract_relevant_data(user_question, language)
+
+        # Build conversation context
+        conversation_context = ""
+        if chat_history and len(chat_history) > 0:
+            recent_history = list(chat_history)[-4:]
+            conversation_context = "\n\nRECENT CONVERSATION:\n"
+            for msg, is_user in recent_history:
+                role = "User" if is_user else "Bot"
+                conversation_context += f"{role}: {msg}\n"
+
+        prompt = f"""
+You are a helpful real estate chatbot for the Brookstone project. Answer user questions based on the provided project data and conversation context. {"Use Gujarati language for responses." if language == 'gujarati' else "Use English language for responses."}
+
+PROJECT DATA:
+{self.fragments.render(language, relevant_data)}{conversation_context}
+
+USER QUESTION: {user_question}
+
+INSTRUCTIONS:
+1. ALWAYS use the PROJECT DATA provided above to answer questions
+2. Consider the RECENT CONVERSATION context - if user says "yes", "sure", "please", they are responding to your previous question
+3. If any detail shows "TBD", say {"આ વિગત હજી નક્કી કરવાની બાકી છે" if language == 'gujarati' else "This detail is yet to be finalized"}
+4. Keep responses concise but comprehensive (max 1000 characters for WhatsApp)
+5. For possession date, mention {"મે 2027" if language == 'gujarati' else "May 2027"}
+6. After answering, ask 1 natural follow-up question to keep conversation going
+7. Be conversational and friendly like a real sales agent
+8. NEVER suggest WhatsApp links - only provide phone numbers
+9. For agent contact, ONLY provide phone number +91 1234567890
+10. Format your response for WhatsApp - use emojis and clear structure
+
+11. For ground floor questions:
+    - Always mention specific dimensions when available
+    - Describe the layout and connections between spaces
+    - Include details about amenities and facilities
+    - If size/dimension is asked but not available, acknowledge that and provide other relevant details
+
+12. When mentioning sizes or dimensions:
+    - Use the exact measurements as provided in the data
+    - Format dimensions clearly with proper units (e.g., "14'-9\" × 14'-6\"")
+    - For carpet area, specify it's carpet area (કાર્પેટ એરિયા in Gujarati)
+    - For total area, specify it's total built-up area (કુલ બિલ્ટ-અપ એરિયા in Gujarati)
+
+13. For BHK queries:
+    - Always mention both carpet area and total area
+    - Include price when available
+    - Specify number of bathrooms and balconies
+    - Mention key features of the layout
+    - If asking about 3BHK, provide 3BHK details first, then briefly mention 4BHK is also available
+    - If asking about 4BHK, provide 4BHK details first, then briefly mention 3BHK is also available
+
+14. Language-specific formatting:
+    - Use native number format for Gujarati (૧,૨,૩,૪,૫,૬,૭,૮,૯,૦)
+    - Use appropriate units: {'ચો.ફૂટ for sqft, કરોડ for crore' if language == 'gujarati' else 'sq ft for area, Cr for crore'}
+    - Use native terms for amenities and facilities when in Gujarati
+
+ANSWER:"""
+
+        return prompt
+
+    def select_route(self, user_question, intents, prompt, chat_history=None):
+        """Model tier and thinking budget for a question; shared by live answers and the warm cache job"""
+        # The history already holds the current message; only earlier bot replies make a short message a follow-up
+        prior_bot_turns = sum(1 for _, is_user in chat_history if not is_user) if chat_history else 0
+        tier = self.model_router.classify(user_question, intents, len(prompt.encode('utf-8')), prior_bot_turns)
+        return tier, self.thinking_budgets.budget(self.thinking_budgets.kind(user_question, intents, tier))
+
+    # ===== GEMINI CALLS =====
+    def call_gemini(self, prompt, language='english', deadline=None, tier='full', thinking_budget=None):
+        """Call Google Gemini API with retry logic on the given model tier ('fast' or 'full')
+
+        thinking_budget None leaves the model's default thinking on; otherwise it
+        caps thought tokens and is added to the tier's output cap so thinking
+        cannot crowd out the answer.
+        """
+        if not self.api_key:
+            return GEMINI_NOT_CONFIGURED_REPLY
+
+        headers = {'Content-Type': 'application/json'}
+
+        timeout = 30
+        out_of_time = False
+        for attempt in range(2):
+            # Skip attempts (and the 2 s pause before a retry) that cannot finish before the reply is due
+            if deadline is not None:
+                if not deadline.allows(self.min_attempt_seconds + (2 if attempt else 0), reserve=self.send_reserve_seconds):
+                    if self.deadline_stats is not None:
+                        self.deadline_stats.skip('gemini_retry' if attempt else 'gemini')
+                    out_of_time = True
+                    break
+            # While a model is failing its traffic moves to the other tier; with both down, return at once
+            model = self.model_router.select(tier)
+            if model is None:
+                logging.warning("🔌 Gemini circuits open on all model tiers, skipping call")
+                break
+            data = {
+                "contents": [{"parts": [{"text": prompt}]}],
+                "generationConfig": {
+                    "temperature": 0.3,
+                    "maxOutputTokens": model.max_output_tokens + (thinking_budget or 0)
+                }
+            }
+            if thinking_budget is not None:
+                data["generationConfig"]["thinkingConfig"] = {"thinkingBudget": thinking_budget}
+            started = time.monotonic()
+            try:
+                if attempt > 0:
+                    time.sleep(2)
+                    started = time.monotonic()
+                if deadline is not None:
+                    timeout = deadline.timeout(30, reserve=self.send_reserve_seconds, floor=1)
+
+                response = requests.post(
+                    f"{model.url}?key={self.api_key}",
+                    headers=headers,
+                    json=data,
+                    timeout=timeout
+                )
+                # Only answered HTTP calls are timed; skipped or short-circuited attempts would skew the percentiles
+                elapsed_ms = (time.monotonic() - started) * 1000
+                self.latency.record(elapsed_ms)
+
+                if response.status_code == 200:
+                    model.record(elapsed_ms, ok=True)
+                    result = response.json()
+                    if thinking_budget is not None:
+                        usage = result.get('usageMetadata', {})
+                        self.thinking_budgets.record(thinking_budget, elapsed_ms, usage.get('thoughtsTokenCount', 0),
+                                                     usage.get('candidatesTokenCount', 0))
+                    if 'candidates' in result and len(result['candidates']) > 0:
+                        candidate = result['candidates'][0]
+                        if 'content' in candidate and 'parts' in candidate['content']:
+                            return candidate['content']['parts'][0]['text']
+                    logging.warning(f"Gemini API ({model.model}) returned no answer text")
+                    break
+
+                model.record(elapsed_ms, ok=False)
+                logging.warning(f"Gemini API ({model.model}) error: {response.status_code}")
+
+            except Exception as e:
+                model.record((time.monotonic() - started) * 1000, ok=False)
+                logging.error(f"Gemini API ({model.model}) exception: {e}")
+                continue
+
+        if out_of_time and self.deadline_stats is not None:
+            self.deadline_stats.fallback()
+        return GEMINI_ERROR_REPLY
+
+    def fallback_answer(self, user_question, language, cache_key):
+        """Fast reply when Gemini failed: a cached earlier answer, else the best-matching FAQ facts"""
+        if cache_key:
+            stale = self.cache.stale(cache_key)
+            if stale is not None:
+                logging.info(f"♻️ Serving cached answer while Gemini is unavailable: {user_question[:60]}")
+                return stale
+
+        # The same fact often appears under several FAQ sections; quote each one once
+        facts = []
+        for path, text in self.retrieve_faq_chunks(user_question, language).items():
+            fact = f"• *{_fact_label(path)}:* {text}"
+            if fact not in facts:
+                facts.append(fact)
+            if len(facts) >= self.fallback_facts:
+                break
+        if not facts:
+            return GEMINI_ERROR_REPLY
+
+        facts = '\n'.join(facts)
+        if language == 'gujarati':
+            return f"""અત્યારે હું વિગતવાર જવાબ આપી શકતો નથી, પરંતુ પ્રોજેક્ટની માહિતી મુજબ:
+
+{facts}
+
+વધુ માહિતી માટે અમારા એજન્ટનો +91 1234567890 પર સંપર્ક કરો."""
+        return f"""I can't give a detailed answer right now, but here is what our project information says:
+
+{facts}
+
+For more details, please contact our agent at +91 1234567890."""
+
+    # ===== ANSWERS =====
+    def generate_answer(self, user_question, language, chat_history, intents=None, deadline=None):
+        """Answer a general question from FAQ templates, the cache, or by building a prompt and calling Gemini"""
+        self.refresh_faq_data()
+
+        # Plain factual questions (possession, address, RERA, sizes, prices) are answered from FAQ fields directly
+        templated = self.templates.answer(user_question, language)
+        if templated is not None:
+            logging.info(f"⚡ Templated FAQ answer for: {user_question[:60]}")
+            return templated
+
+        relevant_data = self.extract_relevant_data(user_question, language, intents)
+
+        if not is_cacheable_question(normalize_question(user_question)):
+            return self._generate_uncached(user_question, language, chat_history, relevant_data, None, deadline, intents)
+
+        cache_key = self.cache.make_key(user_question, language, relevant_data.keys())
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logging.info(f"⚡ Answer cache hit for: {user_question[:60]}")
+            return cached
+
+        # Identical questions arriving together (e.g. after a broadcast) share one Gemini call
+        wait_timeout = deadline.timeout(self.coalesce_timeout, reserve=self.send_reserve_seconds) if deadline else None
+        return self.flights.do(cache_key, self._generate_uncached, user_question, language, chat_history, relevant_data,
+                               cache_key, deadline, intents, wait_timeout=wait_timeout)
+
+    def _generate_uncached(self, user_question, language, chat_history, relevant_data, cache_key, deadline=None,
+                           intents=None):
+        if cache_key:
+            # A previous leader may have finished between our cache miss and taking the lead
+            cached = self.cache.peek(cache_key)
+            if cached is not None:
+                return cached
+
+        prompt = self.create_prompt(user_question, language, chat_history, relevant_data)
+        tier, thinking_budget = self.select_route(user_question, intents, prompt, chat_history)
+        answer = self.call_gemini(prompt, language, deadline, tier, thinking_budget)
+
+        if answer == GEMINI_ERROR_REPLY:
+            # Never cache fallbacks; the next healthy call produces a real answer
+            return self.fallback_answer(user_question, language, cache_key)
+
+        if cache_key and answer != GEMINI_NOT_CONFIGURED_REPLY:
+            self.cache.put(cache_key, answer)
+
+        return answer
+
+    def cache_stats(self):
+        """Cache counters plus the Gemini time the hits are estimated to have saved"""
+        stats = self.cache.stats()
+        gemini = self.latency.snapshot()
+        stats['gemini_latency'] = gemini
+        stats['estimated_seconds_saved'] = round(stats['hits'] * gemini['avg_ms'] / 1000, 1)
+        return stats
+
+    def stats(self):
+        """Return fast-path, cache, coalescing, model and thinking budget metrics"""
+        return {
+            'faq_fast_path': self.templates.stats(),
+            'answer_cache': self.cache_stats(),
+            'gemini_coalescing': self.flights.stats(),
+            'gemini_models': self.model_router.stats(),
+            'gemini_thinking': self.thinking_budgets.stats()
+        }
+
+
+def create_answer_service(deadline_stats=None):
+    """Build the answer service from environment variables (call after load_dotenv())"""
+    # Stop calling Gemini after this many consecutive failures; probe again after the reset timeout
+    breaker_threshold = int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5"))
+    breaker_reset = float(os.getenv("GEMINI_BREAKER_RESET", "30"))
+    # Model tiers: short factual questions go to the fast model, comparisons, plans and long prompts to the full one
+    model_router = ModelRouter([
+        ModelTier('fast', os.getenv("GEMINI_FAST_MODEL", "gemini-2.5-flash-lite"),
+                  int(os.getenv("GEMINI_FAST_MAX_TOKENS", "400")), breaker_threshold, breaker_reset),
+        ModelTier('full', os.getenv("GEMINI_FULL_MODEL", "gemini-2.5-flash"),
+                  int(os.getenv("GEMINI_FULL_MAX_TOKENS", "800")), breaker_threshold, breaker_reset)
+    ], simple_max_words=int(os.getenv("GEMINI_SIMPLE_MAX_WORDS", "12")),
+        simple_max_prompt_bytes=int(os.getenv("GEMINI_SIMPLE_MAX_PROMPT_BYTES", "8000")))
+    # Gemini 2.5 thinking budget (tokens) per request kind; 0 turns thinking off. Added on top of maxOutputTokens.
+    thinking_budgets = ThinkingBudgets(
+        int(os.getenv("GEMINI_THINKING_LOOKUP", "0")),
+        int(os.getenv("GEMINI_THINKING_GENERAL", "512")),
+        int(os.getenv("GEMINI_THINKING_COMPARISON", "2048"))
+    )
+    cache = AnswerCache(
+        max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "500")),
+        ttl_seconds=int(os.getenv("ANSWER_CACHE_TTL", "3600"))
+    )
+    return GeminiAnswerService(
+        os.getenv("GEMINI_API_KEY"),
+        cache,
+        model_router,
+        thinking_budgets,
+        # Followers wait this long for an identical in-flight Gemini call before calling Gemini themselves
+        coalesce_timeout=float(os.getenv("GEMINI_COALESCE_TIMEOUT", "35")),
+        # FAQ retrieval: 'keywords' uses the routed sections with BM25 as the fallback,
+        # 'bm25' sends only project_info plus the top BM25 chunks
+        retrieval=os.getenv("FAQ_RETRIEVAL", "keywords"),
+        retrieval_top_k=int(os.getenv("FAQ_RETRIEVAL_TOP_K", "12")),
+        retrieval_byte_budget=int(os.getenv("FAQ_RETRIEVAL_BYTE_BUDGET", "3000")),
+        # How PROJECT DATA is embedded in the prompt: 'compact' (UTF-8 JSON), 'flat' (path: value) or 'pretty' (legacy)
+        prompt_encoding=os.getenv("PROMPT_DATA_ENCODING", "compact"),
+        # FAQ facts quoted in the reply when Gemini is unavailable and no cached answer exists
+        fallback_facts=int(os.getenv("FALLBACK_FAQ_FACTS", "3")),
+        reload_check_seconds=int(os.getenv("FAQ_RELOAD_CHECK_SECONDS", "30")),
+        min_attempt_seconds=float(os.getenv("GEMINI_MIN_ATTEMPT_SECONDS", "3")),
+        send_reserve_seconds=float(os.getenv("SEND_RESERVE_SECONDS", "5")),
+        deadline_stats=deadline_stats
+    )
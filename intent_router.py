@@ -0,0 +1,86 @@
+import re
+
+# ===== ROUTING TABLE =====
+# intent -> keywords (English and Gujarati). Matching is case-insensitive substring
+# matching, exactly like the old `any(kw in text for kw in [...])` checks.
+MESSAGE_ROUTES = {
+    # Conversation flow
+    'brochure': ['brochure', 'pdf', 'download', 'send brochure', 'share brochure', 'floor plan', 'send pdf',
+                 'બ્રોશર', 'બ્રોશર મોકલો'],
+    'affirmative': ['yes', 'yeah', 'yup', 'sure', 'ok', 'okay', 'please', 'send', 'want', 'need'],
+    'contact_agent': ['whatsapp chat', 'whatsapp number', 'agent whatsapp', 'contact agent', 'agent contact', 'talk to agent'],
+    'site_visit': ['book site visit', 'schedule visit', 'site visit', 'book appointment', 'visit booking',
+                   'સાઇટ વિઝિટ', 'એપોઇન્ટમેન્ટ', 'વિઝિટ બુક', 'મુલાકાત', 'સાઇટ જોવા'],
+
+    # FAQ sections used by extract_relevant_data
+    'ground_floor': ['ground floor', 'ground level', 'ground', 'foyer', 'entrance', 'multipurpose', 'court', 'gym',
+                     'library', 'toddler', 'society', 'seating', 'lift', 'stair', 'amenity', 'facility', 'drop',
+                     'ગ્રાઉન્ડ ફ્લોર', 'જિમ', 'લાઇબ્રેરી'],
+    'block_a_zone': ['block a', 'society', 'toddler', 'right side', 'security'],
+    'block_b_zone': ['block b', 'gym', 'library', 'left side'],
+    'central_amenities': ['central', 'amenity', 'court', 'sand pit', 'lawn', 'facility', 'fountain'],
+    'unit_details': ['3bhk', '3 bhk', 'price', 'cost', 'bhk', 'bedroom', 'size', 'sqft', 'configuration',
+                     'apartment', 'flat', 'carpet', 'area', 'dimension',
+                     'કિંમત', 'ભાવ', 'બીએચકે', 'સાઇઝ', 'કાર્પેટ', 'ફ્લેટ'],
+    '3bhk_details': ['3bhk', '3 bhk', 'carpet', 'કાર્પેટ'],
+    '4bhk_details': ['4bhk', '4 bhk', 'carpet', 'કાર્પેટ'],
+    'unit_plans': ['kitchen', 'room', 'bedroom', 'living', 'dining', 'bathroom', 'toilet', 'balcony',
+                   'રસોડું', 'બેડરૂમ', 'બાલ્કની'],
+    'elevator': ['elevator', 'lift', 'lifts', 'લિફ્ટ'],
+    'parking': ['parking', 'car park', 'vehicle', 'cars', 'પાર્કિંગ'],
+    'specifications': ['structure', 'flooring', 'bathroom', 'kitchen', 'electrical', 'doors', 'windows', 'security',
+                       'water', 'specifications', 'features', 'સ્પેસિફિકેશન'],
+    'amenities': ['amenity', 'amenities', 'facility', 'gym', 'pool', 'park', 'club', 'સુવિધા'],
+    'location': ['location', 'address', 'connectivity', 'metro', 'nearby', 'landmark', 'સરનામું', 'લોકેશન'],
+    'possession': ['possession', 'ready', 'completion', 'timeline', 'delivery', 'પઝેશન', 'કબજો'],
+    'developer': ['developer', 'shatranj', 'aarat', 'group', 'company', 'builder', 'ડેવલપર', 'બિલ્ડર'],
+}
+
+
+def _trie_regex(node):
+    """Render a character trie as a regex that matches the longest keyword at a position"""
+    branches = [re.escape(ch) + _trie_regex(child) for ch, child in sorted(node.items()) if ch != '']
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    return f'(?:{body})?' if '' in node else body
+
+
+class KeywordRouter:
+    """Single-pass multi-keyword matcher compiled from a routing table
+
+    All keywords are merged into one trie-shaped regex wrapped in a lookahead,
+    so one scan of the text reports the longest keyword starting at every
+    position. Each keyword also carries the intents of every shorter keyword
+    it contains, which keeps the results identical to plain substring checks.
+    """
+
+    def __init__(self, routes):
+        keyword_intents = {}
+        for intent, keywords in routes.items():
+            for keyword in keywords:
+                keyword_intents.setdefault(keyword.lower(), set()).add(intent)
+
+        self._intents = {}
+        for keyword in keyword_intents:
+            intents = set()
+            for other, other_intents in keyword_intents.items():
+                if other in keyword:
+                    intents |= other_intents
+            self._intents[keyword] = frozenset(intents)
+
+        trie = {}
+        for keyword in keyword_intents:
+            node = trie
+            for ch in keyword:
+                node = node.setdefault(ch, {})
+            node[''] = True
+        self._pattern = re.compile(f'(?=({_trie_regex(trie)}))')
+        self.intents = frozenset(routes)
+
+    def match(self, text):
+        """Return the set of intents whose keywords occur in text"""
+        found = set()
+        for m in self._pattern.finditer(text.lower()):
+            found |= self._intents[m.group(1)]
+        return found
@@ -0,0 +1,89 @@
+import time
+import queue
+import logging
+import threading
+
+from metrics import LatencyTracker
+
+
+class JobQueue:
+    """Bounded FIFO job queue drained by a fixed pool of worker threads"""
+
+    def __init__(self, name, workers=8, max_size=500):
+        self.name = name
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=max_size)
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_times = LatencyTracker()
+        self.run_times = LatencyTracker()
+
+    def start(self):
+        """Start the worker threads (idempotent, called lazily on first submit)"""
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            logging.info(f"🧵 Started {self.workers} workers for queue '{self.name}'")
+
+    def submit(self, fn, *args, **kwargs):
+        """Enqueue a job without blocking; returns False when the queue is full"""
+        if not self._threads:
+            self.start()
+        try:
+            self._queue.put_nowait((time.monotonic(), fn, args, kwargs))
+        except queue.Full:
+            with self._stats_lock:
+                self.rejected += 1
+            logging.error(f"❌ Queue '{self.name}' is full ({self._queue.maxsize} jobs), rejecting job")
+            return False
+        with self._stats_lock:
+            self.submitted += 1
+        return True
+
+    def _worker(self):
+        while True:
+            enqueued_at, fn, args, kwargs = self._queue.get()
+            started = time.monotonic()
+            self.wait_times.record((started - enqueued_at) * 1000)
+            try:
+                fn(*args, **kwargs)
+                with self._stats_lock:
+                    self.completed += 1
+            except Exception:
+                with self._stats_lock:
+                    self.failed += 1
+                logging.exception(f"❌ Job failed in queue '{self.name}'")
+            finally:
+                self.run_times.record((time.monotonic() - started) * 1000)
+                self._queue.task_done()
+
+    def join(self):
+        """Block until every queued job has been processed"""
+        self._queue.join()
+
+    def stats(self):
+        """Return queue depth, counters and wait/run latency"""
+        with self._stats_lock:
+            counters = {
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected
+            }
+        return {
+            'workers': self.workers,
+            'depth': self._queue.qsize(),
+            'max_size': self._queue.maxsize,
+            **counters,
+            'wait': self.wait_times.snapshot(),
+            'run': self.run_times.snapshot()
+        }
@@ -0,0 +1,71 @@
+import logging
+import threading
+from collections import deque
+
+
+class KeyedExecutor:
+    """Runs jobs in strict submission order per key while different keys run in parallel
+
+    Pending jobs are held in a per-key FIFO. At most one drain job per key is
+    on the underlying JobQueue at any time, so two jobs for the same key can
+    never overlap, while jobs for other keys are picked up by free workers.
+    """
+
+    def __init__(self, job_queue, max_pending_per_key=20):
+        self.job_queue = job_queue
+        self.max_pending_per_key = max_pending_per_key
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._active = set()
+        self.rejected = 0
+
+    def submit(self, key, fn, *args, **kwargs):
+        """Queue a job behind earlier jobs for the same key; returns False when rejected"""
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = deque()
+            if len(pending) >= self.max_pending_per_key:
+                self.rejected += 1
+                logging.warning(f"⚠️ Too many pending jobs for {key} ({len(pending)}), rejecting job")
+                return False
+            pending.append((fn, args, kwargs))
+            if key in self._active:
+                return True
+
+            # JobQueue.submit never blocks, so it is safe to call under the lock
+            if not self.job_queue.submit(self._drain, key):
+                pending.pop()
+                if not pending:
+                    del self._pending[key]
+                return False
+            self._active.add(key)
+            return True
+
+    def _drain(self, key):
+        # Run one job, then requeue the key so one chatty sender cannot hog a worker.
+        # If the queue is full the key keeps this worker instead of losing its turn.
+        while True:
+            with self._lock:
+                fn, args, kwargs = self._pending[key].popleft()
+            try:
+                fn(*args, **kwargs)
+            except Exception:
+                logging.exception(f"❌ Keyed job failed for {key}")
+            with self._lock:
+                if not self._pending[key]:
+                    del self._pending[key]
+                    self._active.discard(key)
+                    return
+            if self.job_queue.submit(self._drain, key):
+                return
+
+    def stats(self):
+        """Return the number of active keys, pending jobs and rejections"""
+        with self._lock:
+            return {
+                'active_keys': len(self._active),
+                'pending_jobs': sum(len(p) for p in self._pending.values()),
+                'max_pending_per_key': self.max_pending_per_key,
+                'rejected': self.rejected
+            }
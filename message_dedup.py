@@ -0,0 +1,110 @@
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings"""
+
+    def __init__(self, capacity, error_rate=1e-6):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class MessageDeduplicator:
+    """Remembers recently seen WhatsApp message IDs so redelivered webhooks are ignored
+
+    IDs live in an exact, time- and size-bounded window first. When they age
+    out they move into a bloom filter generation; two generations rotating
+    every `bloom_window_seconds` extend the horizon cheaply. Only the exact
+    window can be undone with discard(), which is what the webhook needs when
+    it could not enqueue a message and wants Meta's retry to get through.
+
+    Each generation is sized for `bloom_capacity` IDs at `bloom_error_rate`;
+    the defaults (200k IDs at 1e-6) take about 720 KB per generation, so
+    about 1.4 MB once the previous generation is kept. stats() reports the
+    actual size as `bloom_bytes`.
+    """
+
+    def __init__(self, exact_window_seconds=900, max_exact=50000, bloom_window_seconds=43200,
+                 bloom_capacity=200000, bloom_error_rate=1e-6):
+        self.exact_window_seconds = exact_window_seconds
+        self.max_exact = max_exact
+        self.bloom_window_seconds = bloom_window_seconds
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self._exact = OrderedDict()
+        self._current = BloomFilter(bloom_capacity, bloom_error_rate)
+        self._previous = None
+        self._rotated_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.duplicates = 0
+        self.bloom_duplicates = 0
+
+    def seen(self, message_id):
+        """Return True if message_id was already seen; otherwise remember it and return False"""
+        now = time.monotonic()
+        with self._lock:
+            self.checked += 1
+            self._expire(now)
+            if message_id in self._exact:
+                self.duplicates += 1
+                return True
+            if message_id in self._current or (self._previous is not None and message_id in self._previous):
+                self.duplicates += 1
+                self.bloom_duplicates += 1
+                return True
+            self._exact[message_id] = now
+            while len(self._exact) > self.max_exact:
+                old_id, _ = self._exact.popitem(last=False)
+                self._current.add(old_id)
+            return False
+
+    def discard(self, message_id):
+        """Forget a message that was recorded but could not be processed"""
+        with self._lock:
+            self._exact.pop(message_id, None)
+
+    def _expire(self, now):
+        if now - self._rotated_at >= self.bloom_window_seconds:
+            self._previous = self._current
+            self._current = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+            self._rotated_at = now
+        cutoff = now - self.exact_window_seconds
+        while self._exact:
+            old_id, seen_at = next(iter(self._exact.items()))
+            if seen_at > cutoff:
+                break
+            del self._exact[old_id]
+            self._current.add(old_id)
+
+    def stats(self):
+        """Return window sizes, bloom filter memory and duplicate counters"""
+        with self._lock:
+            return {
+                'exact_entries': len(self._exact),
+                'bloom_entries': self._current.count + (self._previous.count if self._previous else 0),
+                'bloom_bytes': len(self._current._bits) + (len(self._previous._bits) if self._previous else 0),
+                'checked': self.checked,
+                'duplicates': self.duplicates,
+                'bloom_duplicates': self.bloom_duplicates
+            }
@@ -0,0 +1,41 @@
+import threading
+from collections import deque
+
+
+class LatencyTracker:
+    """Thread-safe latency recorder keeping totals plus a recent window for percentiles"""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, ms):
+        """Record one observation in milliseconds"""
+        with self._lock:
+            self._recent.append(ms)
+            self.count += 1
+            self.total_ms += ms
+            if ms > self.max_ms:
+                self.max_ms = ms
+
+    def snapshot(self):
+        """Return count, average, p50, p95 and max in milliseconds"""
+        with self._lock:
+            recent = sorted(self._recent)
+            count = self.count
+            total = self.total_ms
+            max_ms = self.max_ms
+
+        if not recent:
+            return {'count': 0, 'avg_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+
+        return {
+            'count': count,
+            'avg_ms': round(total / count, 2),
+            'p50_ms': round(recent[len(recent) // 2], 2),
+            'p95_ms': round(recent[min(len(recent) - 1, int(len(recent) * 0.95))], 2),
+            'max_ms': round(max_ms, 2)
+        }
@@ -0,0 +1,181 @@
+import re
+import threading
+
+from metrics import LatencyTracker
+from circuit_breaker import CircuitBreaker
+
+GEMINI_MODELS_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+
+# Wording that asks for comparison, explanation or advice needs the full model
+COMPLEX_WORDS = {
+    'compare', 'comparison', 'difference', 'differ', 'vs', 'versus', 'better', 'explain', 'why', 'suggest',
+    'recommend', 'which', 'pros', 'cons', 'detail', 'details', 'detailed', 'layout', 'plan', 'plans'
+}
+COMPLEX_GUJARATI = ['તફાવત', 'સરખામણી', 'વિગત', 'કેમ', 'સલાહ', 'લેઆઉટ', 'પ્લાન']
+# Router intents whose FAQ sections are nested room plans and specifications
+COMPLEX_INTENTS = {'unit_plans', '3bhk_details', '4bhk_details', 'specifications'}
+# Questions that weigh options against each other get the largest thinking budget
+COMPARISON_WORDS = {
+    'compare', 'comparison', 'difference', 'differ', 'vs', 'versus', 'better', 'which', 'pros', 'cons',
+    'suggest', 'recommend'
+}
+COMPARISON_GUJARATI = ['તફાવત', 'સરખામણી', 'સલાહ']
+
+
+class ModelTier:
+    """One Gemini model endpoint with its output cap, health breaker and latency/error counters"""
+
+    def __init__(self, name, model, max_output_tokens, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.model = model
+        self.max_output_tokens = max_output_tokens
+        self.url = f"{GEMINI_MODELS_URL}/{model}:generateContent"
+        self.breaker = CircuitBreaker(f'gemini:{name}', failure_threshold, reset_timeout)
+        self.latency = LatencyTracker()
+        self._lock = threading.Lock()
+        self.routed = 0
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, ms, ok):
+        """Record one call's latency and outcome, feeding the tier's breaker"""
+        self.latency.record(ms)
+        with self._lock:
+            self.requests += 1
+            if not ok:
+                self.errors += 1
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                'model': self.model,
+                'max_output_tokens': self.max_output_tokens,
+                'routed': self.routed,
+                'requests': self.requests,
+                'errors': self.errors,
+                'error_rate': round(self.errors / self.requests, 3) if self.requests else 0.0
+            }
+        stats['latency'] = self.latency.snapshot()
+        stats['circuit'] = self.breaker.stats()
+        return stats
+
+
+class ModelRouter:
+    """Classifies a Gemini request as 'fast' or 'full' and picks a healthy tier for it
+
+    A request is simple when the question is short, has no comparison or
+    advice wording, touches none of the large FAQ sections, is not a bare
+    follow-up that only makes sense with the chat history, and its prompt
+    stays under `simple_max_prompt_bytes`. Simple requests go to the fast
+    tier, everything else to the full tier. If the chosen tier's breaker is
+    open, the other tier serves the request instead.
+    """
+
+    def __init__(self, tiers, simple_max_words=12, simple_max_prompt_bytes=8000):
+        self.tiers = {tier.name: tier for tier in tiers}
+        self.order = [tier.name for tier in tiers]
+        self.simple_max_words = simple_max_words
+        self.simple_max_prompt_bytes = simple_max_prompt_bytes
+        self._lock = threading.Lock()
+        self.fallbacks = 0
+
+    def classify(self, question, intents=(), prompt_bytes=0, prior_bot_turns=0):
+        """Return 'fast' for simple requests and 'full' for everything else"""
+        text = question.lower()
+        words = re.findall(r'\w+', text)
+        if len(words) > self.simple_max_words or prompt_bytes > self.simple_max_prompt_bytes:
+            return 'full'
+        if COMPLEX_WORDS.intersection(words) or any(marker in text for marker in COMPLEX_GUJARATI):
+            return 'full'
+        if COMPLEX_INTENTS.intersection(intents or ()):
+            return 'full'
+        # "yes" / "the second one" after a bot message depends on the conversation, not the FAQ
+        if prior_bot_turns and len(words) <= 3:
+            return 'full'
+        return 'fast'
+
+    def select(self, preferred):
+        """Return the preferred tier if its breaker allows a call, else the first other tier that does"""
+        tier = self.tiers.get(preferred) or self.tiers[self.order[-1]]
+        if tier.breaker.allow():
+            with self._lock:
+                tier.routed += 1
+            return tier
+        for name in self.order:
+            other = self.tiers[name]
+            if other is not tier and other.breaker.allow():
+                with self._lock:
+                    other.routed += 1
+                    self.fallbacks += 1
+                return other
+        return None
+
+    def stats(self):
+        """Return per-tier routing, latency, errors and breaker state"""
+        with self._lock:
+            fallbacks = self.fallbacks
+        return {
+            'simple_max_words': self.simple_max_words,
+            'simple_max_prompt_bytes': self.simple_max_prompt_bytes,
+            'fallbacks': fallbacks,
+            'tiers': {name: tier.stats() for name, tier in self.tiers.items()}
+        }
+
+
+class ThinkingBudgets:
+    """Picks a Gemini 2.5 thinking budget per request kind and tracks latency and thought tokens per budget
+
+    Kinds: 'lookup' (greetings and questions routed to the fast tier),
+    'comparison' (wording that weighs options) and 'general' (the rest).
+    A budget of 0 turns thinking off.
+    """
+
+    def __init__(self, lookup=0, general=512, comparison=2048):
+        self.budgets = {'lookup': lookup, 'general': general, 'comparison': comparison}
+        self._lock = threading.Lock()
+        self._by_budget = {}
+
+    def kind(self, question, intents=(), tier='full'):
+        """Return 'comparison', 'lookup' or 'general' for a question"""
+        text = question.lower()
+        if COMPARISON_WORDS.intersection(re.findall(r'\w+', text)) or any(marker in text for marker in COMPARISON_GUJARATI):
+            return 'comparison'
+        # No FAQ intent matched (e.g. a greeting) or the router judged it a simple lookup
+        if not intents or tier == 'fast':
+            return 'lookup'
+        return 'general'
+
+    def budget(self, kind):
+        return self.budgets.get(kind, self.budgets['general'])
+
+    def record(self, budget, ms, thoughts_tokens=0, output_tokens=0):
+        """Record one successful call's latency and token usage under its budget"""
+        with self._lock:
+            entry = self._by_budget.get(budget)
+            if entry is None:
+                entry = self._by_budget[budget] = {
+                    'latency': LatencyTracker(), 'calls': 0, 'thoughts_tokens': 0, 'output_tokens': 0
+                }
+            entry['calls'] += 1
+            entry['thoughts_tokens'] += thoughts_tokens
+            entry['output_tokens'] += output_tokens
+        entry['latency'].record(ms)
+
+    def stats(self):
+        """Return configured budgets plus latency and average thought/output tokens per budget"""
+        with self._lock:
+            entries = [(budget, dict(entry)) for budget, entry in sorted(self._by_budget.items())]
+        by_budget = {}
+        for budget, entry in entries:
+            calls = entry['calls']
+            by_budget[str(budget)] = {
+                'calls': calls,
+                'avg_thoughts_tokens': round(entry['thoughts_tokens'] / calls, 1),
+                'avg_output_tokens': round(entry['output_tokens'] / calls, 1),
+                'latency': entry['latency'].snapshot()
+            }
+        return {'budgets': dict(self.budgets), 'by_budget': by_budget}
@@ -0,0 +1,96 @@
+"""Serialization of FAQ data for Gemini prompts, plus a size report
+
+Run `python prompt_encoding.py` to print bytes and estimated tokens per FAQ
+section for every encoding mode and language.
+"""
+import sys
+import json
+import argparse
+
+from faq_index import flatten_faq
+
+ENCODING_MODES = ('pretty', 'compact', 'flat')
+
+
+def encode_project_data(data, mode='compact'):
+    """Serialize prompt data
+
+    pretty  - legacy json.dumps(indent=2): whitespace plus \\uXXXX escapes for Gujarati
+    compact - UTF-8 JSON without optional whitespace
+    flat    - one `json.path: value` line per leaf
+    """
+    if mode == 'pretty':
+        return json.dumps(data, indent=2)
+    if mode == 'flat':
+        return '\n'.join(f"{path}: {text}" for path, text in flatten_faq(data))
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def encode_fragment(name, value, mode='compact'):
+    """Serialize one top-level `name: value` member so fragments can be joined later"""
+    if mode == 'pretty':
+        return json.dumps({name: value}, indent=2)[2:-2]
+    if mode == 'flat':
+        return encode_project_data({name: value}, 'flat')
+    return (json.dumps(name, ensure_ascii=False) + ':' +
+            json.dumps(value, ensure_ascii=False, separators=(',', ':')))
+
+
+def join_fragments(fragments, mode='compact'):
+    """Join encoded fragments; equals encode_project_data() of the combined dict"""
+    if mode == 'pretty':
+        return '{\n' + ',\n'.join(fragments) + '\n}' if fragments else '{}'
+    if mode == 'flat':
+        return '\n'.join(fragment for fragment in fragments if fragment)
+    return '{' + ','.join(fragments) + '}'
+
+
+def estimate_tokens(text):
+    """Rough token estimate: ~4 ASCII characters per token, ~1.5 characters per token for Indic script"""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return round((len(text) - non_ascii) / 4 + non_ascii / 1.5)
+
+
+def measure_sections(lang_data, modes=ENCODING_MODES):
+    """Return {section: {mode: (bytes, estimated_tokens)}} for one language"""
+    report = {}
+    for section, value in lang_data.items():
+        report[section] = {}
+        for mode in modes:
+            encoded = encode_project_data({section: value}, mode)
+            report[section][mode] = (len(encoded.encode('utf-8')), estimate_tokens(encoded))
+    return report
+
+
+def print_report(language, lang_data, modes=ENCODING_MODES):
+    report = measure_sections(lang_data, modes)
+    header = f"{'section':32}" + ''.join(f"{mode + ' bytes/tok':>22}" for mode in modes)
+    print(f"\n=== {language} ===")
+    print(header)
+    totals = {mode: [0, 0] for mode in modes}
+    for section, sizes in report.items():
+        row = f"{section:32}"
+        for mode in modes:
+            size, tokens = sizes[mode]
+            totals[mode][0] += size
+            totals[mode][1] += tokens
+            row += f"{f'{size}/{tokens}':>22}"
+        print(row)
+    print(f"{'TOTAL':32}" + ''.join(f"{f'{totals[m][0]}/{totals[m][1]}':>22}" for m in modes))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report prompt size per FAQ section and encoding mode")
+    parser.add_argument('--language', choices=['english', 'gujarati'], help="Only report one language")
+    parser.add_argument('--faq-dir', default='.', help="Directory holding faq_data_<language>.json")
+    args = parser.parse_args(argv)
+
+    languages = [args.language] if args.language else ['english', 'gujarati']
+    for language in languages:
+        with open(f"{args.faq_dir}/faq_data_{language}.json", 'r', encoding='utf-8') as f:
+            print_report(language, json.load(f))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import time
+import random
+import threading
+from collections import OrderedDict
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a send would have to wait for the rate limiter longer than its time budget allows"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens per second up to `burst`"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self):
+        """Take one token, going into debt if needed; returns seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._blocked_until - now)
+
+    def release(self):
+        """Give back a token taken by reserve() that will not be used"""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    def try_take(self):
+        """Take one token only if one is available right now"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens < 1 or now < self._blocked_until:
+                return False
+            self._tokens -= 1
+            return True
+
+    def block_for(self, seconds):
+        """Hold every reservation back for at least `seconds` (e.g. after a Retry-After)"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+class OutboundLimiter:
+    """Global plus per-recipient token buckets for outbound WhatsApp Cloud API calls
+
+    The global bucket caps business-number throughput; per-recipient buckets
+    follow the pair rate limit (a short burst, then a slow steady rate to the
+    same user). Calls without a recipient, such as read receipts, only use
+    the global bucket. Least recently used recipient buckets are dropped
+    beyond `max_recipients`.
+    """
+
+    def __init__(self, rate_per_second=80, burst=80, pair_rate_per_second=1 / 6, pair_burst=10,
+                 max_recipients=10000):
+        self.pair_rate_per_second = pair_rate_per_second
+        self.pair_burst = pair_burst
+        self.max_recipients = max_recipients
+        self.global_bucket = TokenBucket(rate_per_second, burst)
+        self._recipients = OrderedDict()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.delayed = 0
+        self.rejected = 0
+        self.waited_ms = 0.0
+
+    def _recipient_bucket(self, recipient):
+        with self._lock:
+            bucket = self._recipients.get(recipient)
+            if bucket is None:
+                bucket = self._recipients[recipient] = TokenBucket(self.pair_rate_per_second, self.pair_burst)
+                self._trim()
+            else:
+                self._recipients.move_to_end(recipient)
+            return bucket
+
+    def _trim(self):
+        while len(self._recipients) > self.max_recipients:
+            self._recipients.popitem(last=False)
+
+    def acquire(self, recipient=None, max_wait=None):
+        """Block until a send to recipient is allowed; returns the seconds waited
+
+        If the wait would exceed `max_wait` seconds the reservation is given
+        back and None is returned at once instead of sleeping.
+        """
+        buckets = [self.global_bucket]
+        if recipient:
+            buckets.append(self._recipient_bucket(recipient))
+        wait = max(bucket.reserve() for bucket in buckets)
+        if max_wait is not None and wait > max_wait:
+            for bucket in buckets:
+                bucket.release()
+            with self._lock:
+                self.rejected += 1
+            return None
+        with self._lock:
+            self.acquired += 1
+            if wait > 0:
+                self.delayed += 1
+                self.waited_ms += wait * 1000
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def throttled(self, seconds, recipient=None):
+        """Back off after a throttling response, for one recipient or for everyone"""
+        if recipient:
+            self._recipient_bucket(recipient).block_for(seconds)
+        else:
+            self.global_bucket.block_for(seconds)
+
+    def stats(self):
+        """Return configured rates, tracked recipients and wait counters"""
+        with self._lock:
+            return {
+                'rate_per_second': self.global_bucket.rate,
+                'burst': self.global_bucket.burst,
+                'pair_rate_per_second': round(self.pair_rate_per_second, 4),
+                'pair_burst': self.pair_burst,
+                'recipients': len(self._recipients),
+                'acquired': self.acquired,
+                'delayed': self.delayed,
+                'rejected': self.rejected,
+                'waited_ms': round(self.waited_ms, 1)
+            }
+
+
+def backoff_delay(attempt, base_seconds=0.5, max_seconds=30.0):
+    """Exponential backoff with full jitter for retry number `attempt` (0-based)"""
+    return random.uniform(0, min(max_seconds, base_seconds * (2 ** attempt)))
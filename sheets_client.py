@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import logging
+import threading
+
+import gspread
+from gspread.exceptions import APIError
+from google.auth.exceptions import RefreshError
+from google.auth.transport.requests import Request
+from google.oauth2.service_account import Credentials
+
+SHEETS_SCOPES = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+
+
+def credentials_from_env(variable='GOOGLE_CREDENTIALS', scopes=SHEETS_SCOPES):
+    """Build service account credentials from a JSON string held in an environment variable"""
+    creds_json = os.getenv(variable)
+    if not creds_json:
+        raise ValueError(f"{variable} environment variable not set")
+    return Credentials.from_service_account_info(json.loads(creds_json), scopes=scopes)
+
+
+def credentials_from_file(path='credentials.json', scopes=SHEETS_SCOPES):
+    """Build service account credentials from a key file"""
+    return Credentials.from_service_account_file(path, scopes=scopes)
+
+
+class SheetsClientHolder:
+    """Long-lived gspread client shared by every booking sync cycle
+
+    Credentials are loaded once and their access token is refreshed only
+    when it has expired. Spreadsheets are looked up by title once; after
+    that the worksheet object is reused, and a rebuilt client reopens it by
+    its cached key, which skips the Drive search. Auth failures drop the
+    client so the next call starts from fresh credentials.
+    """
+
+    def __init__(self, credentials_loader):
+        self.credentials_loader = credentials_loader
+        self._lock = threading.Lock()
+        self._creds = None
+        self._client = None
+        self._keys = {}
+        self._worksheets = {}
+        self.builds = 0
+        self.token_refreshes = 0
+        self.title_lookups = 0
+        self.key_opens = 0
+        self.worksheet_hits = 0
+        self.auth_errors = 0
+        self.last_build_ms = 0.0
+
+    def _ensure_client(self):
+        if self._client is None:
+            started = time.monotonic()
+            self._creds = self.credentials_loader()
+            self._creds.refresh(Request())
+            self._client = gspread.authorize(self._creds)
+            self._worksheets = {}
+            self.builds += 1
+            self.last_build_ms = round((time.monotonic() - started) * 1000, 1)
+            logging.info(f"🔑 Google Sheets client built in {self.last_build_ms} ms")
+        elif not self._creds.valid:
+            self._creds.refresh(Request())
+            self.token_refreshes += 1
+        return self._client
+
+    def worksheet(self, title):
+        """Return the first worksheet of the spreadsheet called title"""
+        with self._lock:
+            client = self._ensure_client()
+            sheet = self._worksheets.get(title)
+            if sheet is not None:
+                self.worksheet_hits += 1
+                return sheet
+            key = self._keys.get(title)
+            if key is None:
+                spreadsheet = client.open(title)
+                self._keys[title] = spreadsheet.id
+                self.title_lookups += 1
+            else:
+                spreadsheet = client.open_by_key(key)
+                self.key_opens += 1
+            sheet = self._worksheets[title] = spreadsheet.sheet1
+            return sheet
+
+    def invalidate(self):
+        """Drop credentials, client and worksheets (spreadsheet keys are kept)"""
+        with self._lock:
+            self._creds = None
+            self._client = None
+            self._worksheets = {}
+
+    def handle_error(self, error):
+        """Invalidate the client if error is an authentication failure; returns True if it was"""
+        is_auth = isinstance(error, RefreshError) or (isinstance(error, APIError) and error.code in (401, 403))
+        if is_auth:
+            self.auth_errors += 1
+            logging.warning(f"🔑 Google Sheets auth error, rebuilding client: {error}")
+            self.invalidate()
+        elif isinstance(error, APIError) and error.code == 404:
+            # Spreadsheet was replaced or access revoked; look it up by title again
+            with self._lock:
+                self._keys = {}
+                self._worksheets = {}
+        return is_auth
+
+    def stats(self):
+        """Return client build, refresh and worksheet cache counters"""
+        return {
+            'connected': self._client is not None,
+            'builds': self.builds,
+            'last_build_ms': self.last_build_ms,
+            'token_refreshes': self.token_refreshes,
+            'title_lookups': self.title_lookups,
+            'key_opens': self.key_opens,
+            'worksheet_hits': self.worksheet_hits,
+            'auth_errors': self.auth_errors
+        }
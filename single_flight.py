@@ -0,0 +1,75 @@
+import logging
+import threading
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'failed')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution
+
+    The first caller (the leader) runs the function; callers arriving while it
+    is in flight wait for its result. Followers wait at most `timeout` seconds
+    and then run the function themselves, so a stuck leader cannot stall them.
+    """
+
+    def __init__(self, timeout=35):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def do(self, key, fn, *args, wait_timeout=None, **kwargs):
+        """Run fn for key, or share the result of an identical call already in flight
+
+        wait_timeout, if given, shortens how long a follower waits (e.g. to a message's remaining budget).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+            else:
+                leader = False
+
+        if leader:
+            try:
+                call.result = fn(*args, **kwargs)
+                return call.result
+            except Exception:
+                call.failed = True
+                raise
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.event.set()
+
+        timeout = self.timeout if wait_timeout is None else max(0.0, min(self.timeout, wait_timeout))
+        if call.event.wait(timeout) and not call.failed:
+            with self._lock:
+                self.coalesced += 1
+            return call.result
+
+        with self._lock:
+            self.timeouts += 1
+        logging.warning(f"⚠️ In-flight call for {key[:12]} did not complete in {timeout:.1f}s, running it directly")
+        return fn(*args, **kwargs)
+
+    def stats(self):
+        """Return leader/follower counters and current in-flight keys"""
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+                'timeouts': self.timeouts
+            }
@@ -0,0 +1,49 @@
+from answer_cache import AnswerCache
+
+
+def test_keys_change_with_the_faq_version():
+    cache = AnswerCache(faq_version='v1')
+    old_key = cache.make_key('Where is the site?', 'english', ['location'])
+    assert cache.make_key('where is the site', 'english', ['location']) == old_key
+    cache.set_faq_version('v2')
+    assert cache.make_key('Where is the site?', 'english', ['location']) != old_key
+
+
+def test_answer_from_a_call_started_before_a_faq_change_is_not_served():
+    cache = AnswerCache(faq_version='v1')
+    # A leader computes its key, then the FAQ changes while Gemini is answering
+    leader_key = cache.make_key('price of 3bhk', 'english', ['pricing'])
+    cache.set_faq_version('v2')
+    cache.put(leader_key, 'old price')
+
+    new_key = cache.make_key('price of 3bhk', 'english', ['pricing'])
+    assert cache.get(new_key) is None
+    assert cache.stale(new_key) is None
+
+
+def test_faq_change_drops_existing_entries():
+    cache = AnswerCache(faq_version='v1')
+    key = cache.make_key('parking', 'english', ['amenities'])
+    cache.put(key, 'answer')
+    assert cache.get(key) == 'answer'
+    assert cache.set_faq_version('v2') is True
+    assert cache.get(key) is None
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_entries_can_outlive_the_cache_ttl(monkeypatch):
+    import answer_cache
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, 'monotonic', lambda: now[0])
+    cache = AnswerCache(ttl_seconds=3600, faq_version='v1')
+    cache.put('live', 'live answer')
+    cache.put('warm', 'warm answer', ttl_seconds=0)
+    cache.put('day', 'day answer', ttl_seconds=86400)
+
+    now[0] += 3601
+    assert cache.get('live') is None
+    assert cache.get('warm') == 'warm answer'
+    assert cache.peek('day') == 'day answer'
+    now[0] += 86400
+    assert cache.get('day') is None
+    assert cache.get('warm') == 'warm answer'
@@ -0,0 +1,211 @@
+import re
+
+import pytest
+from gspread.exceptions import APIError
+from gspread.utils import a1_to_rowcol
+
+from booking_sync import BookingService, BookingSheetCursor, BookingStatusWriter
+
+HEADER = ['Name', 'Phone', 'Preferred Date', 'Preferred Time', 'Status']
+
+
+class FakeCell:
+    def __init__(self, value):
+        self.value = value
+
+
+class FakeSheet:
+    """In-memory worksheet with the few gspread calls the booking sync uses"""
+
+    def __init__(self, rows):
+        self.rows = [list(HEADER)] + [list(row) for row in rows]
+        self.reads = []
+        self.batch_updates = []
+
+    def append(self, row):
+        self.rows.append(list(row))
+
+    def row_values(self, row_num):
+        return list(self.rows[row_num - 1])
+
+    def get(self, a1_range):
+        self.reads.append(a1_range)
+        start, end = (int(n) for n in re.findall(r'\d+', a1_range))
+        # Like the API, trailing empty rows are not returned
+        return [list(row) for row in self.rows[start - 1:end]]
+
+    def cell(self, row_num, col):
+        row = self.rows[row_num - 1]
+        return FakeCell(row[col - 1] if col <= len(row) else '')
+
+    def batch_update(self, data):
+        self.batch_updates.append(data)
+        for update in data:
+            row_num, col = a1_to_rowcol(update['range'])
+            row = self.rows[row_num - 1]
+            row.extend([''] * (col - len(row)))
+            row[col - 1] = update['values'][0][0]
+
+
+class FakeSheets:
+    def __init__(self, sheet):
+        self.sheet = sheet
+        self.errors = []
+
+    def worksheet(self, title):
+        return self.sheet
+
+    def handle_error(self, error):
+        self.errors.append(error)
+        return False
+
+
+class FakeResponse:
+    def __init__(self, code):
+        self.code = code
+        self.text = ''
+
+    def json(self):
+        return {'error': {'code': self.code, 'message': 'quota', 'status': 'RESOURCE_EXHAUSTED'}}
+
+
+class FlakySheet(FakeSheet):
+    """Fails the first `failures` batch updates with the given API error code"""
+
+    def __init__(self, rows, failures, code):
+        super().__init__(rows)
+        self.failures = failures
+        self.code = code
+
+    def batch_update(self, data):
+        if self.failures:
+            self.failures -= 1
+            raise APIError(FakeResponse(self.code))
+        super().batch_update(data)
+
+
+def _booking(i, status=''):
+    return [f'Guest {i}', f'98765{i:05d}', '2026-11-01', '11:00', status]
+
+
+def test_cursor_reads_only_rows_appended_since_the_last_advance():
+    sheet = FakeSheet([_booking(i) for i in range(3)])
+    cursor = BookingSheetCursor(batch_size=10)
+
+    rows = cursor.read_new_rows(sheet)
+    assert [row_num for row_num, _ in rows] == [2, 3, 4]
+    assert rows[0][1]['Name'] == 'Guest 0'
+    cursor.advance(rows)
+
+    assert cursor.read_new_rows(sheet) == []
+    sheet.append(_booking(3))
+    rows = cursor.read_new_rows(sheet)
+    assert [row_num for row_num, _ in rows] == [5]
+    assert sheet.reads[-1].startswith('A5:')
+
+
+def test_cursor_pages_through_large_backlogs_in_bounded_reads():
+    sheet = FakeSheet([_booking(i) for i in range(25)])
+    cursor = BookingSheetCursor(batch_size=10)
+
+    rows = cursor.read_new_rows(sheet)
+    assert len(rows) == 25
+    assert sheet.reads == ['A2:E11', 'A12:E21', 'A22:E31']
+    assert cursor.stats()['rows_scanned_last_cycle'] == 25
+
+
+def test_cursor_pads_short_rows_and_keeps_position_after_reset():
+    sheet = FakeSheet([['Guest', '9876500000']])
+    cursor = BookingSheetCursor()
+    rows = cursor.read_new_rows(sheet)
+    assert rows[0][1]['Status'] == ''
+    assert cursor.column('Status') == 5
+    cursor.advance(rows)
+
+    cursor.reset()
+    sheet.append(_booking(1))
+    assert [row_num for row_num, _ in cursor.read_new_rows(sheet)] == [3]
+
+
+def test_advance_never_moves_the_high_water_mark_backwards():
+    cursor = BookingSheetCursor()
+    cursor.advance([(10, {})])
+    cursor.advance([(4, {})])
+    cursor.advance([])
+    assert cursor.next_row == 11
+
+
+def test_status_writer_sends_all_queued_statuses_in_one_request():
+    sheet = FakeSheet([_booking(i) for i in range(3)])
+    writer = BookingStatusWriter()
+    writer.set(2, 'Confirmed')
+    writer.set(4, 'Pending - WhatsApp Failed')
+    writer.set(2, 'Confirmed')
+
+    assert writer.flush(sheet, 5) == 2
+    assert len(sheet.batch_updates) == 1
+    assert [row[4] for row in sheet.rows[1:]] == ['Confirmed', '', 'Pending - WhatsApp Failed']
+    assert len(writer) == 0
+    assert writer.flush(sheet, 5) == 0
+
+
+def test_status_writer_retries_quota_errors():
+    sheet = FlakySheet([_booking(0)], failures=2, code=429)
+    writer = BookingStatusWriter(max_attempts=4, backoff_seconds=0)
+    writer.set(2, 'Confirmed')
+    assert writer.flush(sheet, 5) == 1
+    assert writer.stats()['quota_retries'] == 2
+    assert sheet.rows[1][4] == 'Confirmed'
+
+
+def test_failed_flush_keeps_statuses_for_the_next_cycle():
+    sheet = FlakySheet([_booking(0)], failures=1, code=500)
+    writer = BookingStatusWriter(backoff_seconds=0)
+    writer.set(2, 'Confirmed')
+    with pytest.raises(APIError):
+        writer.flush(sheet, 5)
+    assert writer.status_of(2) == 'Confirmed'
+    assert writer.flush(sheet, 5) == 1
+    assert sheet.rows[1][4] == 'Confirmed'
+
+
+def _service(sheet, sent):
+    return BookingService(FakeSheets(sheet), 'Site Visits', lambda to, message: sent.append(to) or True,
+                          webhook_token='secret', dispatch_rate=0)
+
+
+def test_pushed_row_already_confirmed_by_the_poll_is_not_sent_again():
+    sheet = FakeSheet([_booking(0)])
+    sent = []
+    service = _service(sheet, sent)
+
+    assert service.check_new_bookings()
+    assert sent == ['+919876500000']
+    service.confirm_pushed(2, dict(zip(HEADER, _booking(0))))
+    assert sent == ['+919876500000']
+    assert len(sheet.batch_updates) == 1
+
+
+def test_poll_skips_rows_confirmed_by_a_push_even_if_the_write_back_failed():
+    sheet = FlakySheet([_booking(0)], failures=1, code=500)
+    sent = []
+    service = _service(sheet, sent)
+
+    # The push sends but cannot write its status; it stays queued
+    service.confirm_pushed(2, dict(zip(HEADER, _booking(0))))
+    assert sent == ['+919876500000']
+    assert sheet.rows[1][4] == ''
+
+    # The poll sees the empty Status cell but the writer remembers the row, and writes it
+    assert service.check_new_bookings()
+    assert sent == ['+919876500000']
+    assert sheet.rows[1][4] == 'Confirmed'
+
+
+def test_rows_with_a_status_in_the_sheet_are_not_confirmed():
+    sheet = FakeSheet([_booking(0, status='Confirmed'), _booking(1)])
+    sent = []
+    service = _service(sheet, sent)
+    service.confirm_pushed(2, dict(zip(HEADER, _booking(0))))
+    service.check_new_bookings()
+    assert sent == ['+919876500001']
@@ -0,0 +1,86 @@
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', clock)
+    return clock
+
+
+def _open(breaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker('gemini', failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+    _open(breaker)
+    assert breaker.state == 'open'
+    assert breaker.allow() is False
+    assert breaker.stats()['short_circuited'] == 1
+
+
+def test_half_open_lets_a_single_probe_through_after_the_timeout(clock):
+    breaker = CircuitBreaker('gemini', failure_threshold=2, reset_timeout=30)
+    _open(breaker)
+    clock.now += 29
+    assert breaker.allow() is False
+
+    clock.now += 1
+    assert breaker.allow() is True
+    assert breaker.state == 'half_open'
+    assert breaker.allow() is False  # the probe is still out
+
+
+def test_successful_probe_closes_the_breaker(clock):
+    breaker = CircuitBreaker('gemini', failure_threshold=2, reset_timeout=30)
+    _open(breaker)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.consecutive_failures == 0
+    assert all(breaker.allow() for _ in range(5))
+
+
+def test_failed_probe_reopens_for_another_timeout(clock):
+    breaker = CircuitBreaker('gemini', failure_threshold=2, reset_timeout=30)
+    _open(breaker)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert breaker.stats()['opened'] == 2
+    clock.now += 29
+    assert breaker.allow() is False
+    clock.now += 1
+    assert breaker.allow() is True
+
+
+def test_lost_probe_is_replaced_after_the_timeout(clock):
+    breaker = CircuitBreaker('gemini', failure_threshold=1, reset_timeout=30)
+    _open(breaker)
+    clock.now += 30
+    assert breaker.allow()
+    # The probe never reports back
+    clock.now += 30
+    assert breaker.allow() is True
+    assert breaker.stats()['probes'] == 2
@@ -0,0 +1,79 @@
+import os
+import time
+
+from conversation_journal import ConversationJournal
+
+
+def _state(name, age=0):
+    return {'name': name, 'last_active': time.time() - age}
+
+
+def _restart(journal):
+    """Simulate a process restart: drop the open segment and replay from disk with a new journal"""
+    journal._file.close()
+    fresh = ConversationJournal(journal.directory, retention_seconds=journal.retention_seconds)
+    return fresh, fresh.replay()
+
+
+def _segment_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.startswith('journal-'))
+
+
+def test_replay_keeps_the_latest_state_across_segments(tmp_path):
+    journal = ConversationJournal(str(tmp_path))
+    assert journal.replay() == {}
+    journal.record('111', _state('first'))
+    journal.record('222', _state('other'))
+
+    journal, states = _restart(journal)
+    assert {phone: s['name'] for phone, s in states.items()} == {'111': 'first', '222': 'other'}
+    journal.record('111', _state('second'))
+
+    journal, states = _restart(journal)
+    assert states['111']['name'] == 'second'
+    assert states['222']['name'] == 'other'
+    assert journal.last_replay['journal_records'] == 3
+    assert _segment_files(str(tmp_path)) == ['journal-0.log', 'journal-1.log', 'journal-2.log']
+
+
+def test_compaction_folds_closed_segments_into_the_snapshot(tmp_path):
+    journal = ConversationJournal(str(tmp_path))
+    journal.replay()
+    for i in range(5):
+        journal.record('111', _state(f'v{i}'))
+    journal.record('222', _state('other'))
+
+    journal.compact()
+    assert _segment_files(str(tmp_path)) == ['journal-1.log']
+    assert journal.last_snapshot['conversations'] == 2
+    assert journal.last_snapshot['folded_journal_records'] == 6
+
+    # Writes after the snapshot land in the new segment and win on replay
+    journal.record('111', _state('after'))
+    journal, states = _restart(journal)
+    assert states['111']['name'] == 'after'
+    assert states['222']['name'] == 'other'
+    assert journal.last_replay['snapshot_records'] == 2
+    assert journal.last_replay['journal_records'] == 1
+
+
+def test_states_older_than_retention_are_dropped(tmp_path):
+    journal = ConversationJournal(str(tmp_path), retention_seconds=3600)
+    journal.replay()
+    journal.record('111', _state('stale', age=7200))
+    journal.record('222', _state('fresh'))
+    journal.compact()
+
+    journal, states = _restart(journal)
+    assert list(states) == ['222']
+
+
+def test_torn_final_line_is_skipped(tmp_path):
+    journal = ConversationJournal(str(tmp_path))
+    journal.replay()
+    journal.record('111', _state('intact'))
+    journal._file.write('{"p":"222","s":{"na')
+    journal._file.flush()
+
+    journal, states = _restart(journal)
+    assert list(states) == ['111']
@@ -0,0 +1,95 @@
+import multiprocessing
+
+import pytest
+
+from conversation_store import ConversationState, ConversationStore, SQLiteConversationStore
+
+PHONE = '919999999999'
+TURNS_PER_PROCESS = 25
+
+
+def _set_language(state):
+    state.language = 'gujarati'
+
+
+def _set_lead_capture(state):
+    state.lead_capture_mode = 'booking'
+
+
+def _set_brochure(state):
+    state.asked_about_brochure = True
+
+
+def _set_booking_name(state):
+    state.booking_info['name'] = 'Asha'
+
+
+FIELD_UPDATES = [_set_language, _set_lead_capture, _set_brochure, _set_booking_name]
+
+
+def _worker(path, index, start):
+    # Each process opens its own connection, like separate gunicorn workers
+    store = SQLiteConversationStore(path, history_limit=1000)
+    start.wait()
+    for turn in range(TURNS_PER_PROCESS):
+        state = store.load(PHONE)
+        state.add_turn(f'p{index}-t{turn}', True)
+        if turn == TURNS_PER_PROCESS // 2:
+            FIELD_UPDATES[index](state)
+        assert store.commit(state, attempts=1000)
+
+
+def test_concurrent_processes_keep_turns_and_fields(tmp_path):
+    path = str(tmp_path / 'conversations.db')
+    # Create the table up front, and close the connection: SQLite connections must not cross fork()
+    SQLiteConversationStore(path)._conn().close()
+    context = multiprocessing.get_context('fork')
+    start = context.Event()
+    processes = [context.Process(target=_worker, args=(path, index, start)) for index in range(len(FIELD_UPDATES))]
+    for process in processes:
+        process.start()
+    start.set()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    state = SQLiteConversationStore(path, history_limit=1000).load(PHONE)
+    messages = {message for message, _ in state.chat_history}
+    assert messages == {f'p{index}-t{turn}' for index in range(len(FIELD_UPDATES)) for turn in range(TURNS_PER_PROCESS)}
+    assert state.language == 'gujarati'
+    assert state.lead_capture_mode == 'booking'
+    assert state.asked_about_brochure is True
+    assert state.booking_info == {'name': 'Asha'}
+
+
+def test_merge_keeps_fields_the_other_copy_did_not_change():
+    latest = ConversationState(PHONE)
+    latest.language = 'gujarati'
+    stale = ConversationState(PHONE)
+    stale.add_turn('hello', True)
+    stale.booking_info['name'] = 'Asha'
+
+    latest.merge_from(stale)
+
+    assert latest.language == 'gujarati'
+    assert latest.booking_info == {'name': 'Asha'}
+    assert list(latest.chat_history) == [('hello', True)]
+
+
+def test_memory_store_save_respects_max_entries():
+    store = ConversationStore(max_entries=2)
+    evicted = store.load('1')
+    store.load('2')
+    store.load('3')
+    assert '1' not in store
+    store.save(evicted)
+    assert len(store) == 2
+
+
+def test_sqlite_stats_count_bytes(tmp_path):
+    store = SQLiteConversationStore(str(tmp_path / 'conversations.db'))
+    state = store.load(PHONE)
+    state.add_turn('નમસ્તે', True)
+    assert store.save(state)
+    data_chars = len(store._conn().execute("SELECT data FROM conversations").fetchone()[0])
+    assert store.stats()['approx_bytes'] > data_chars
@@ -0,0 +1,74 @@
+import json
+import os
+
+import pytest
+
+from faq_answers import FaqAnswerEngine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def engine():
+    faq_data = {}
+    for language in ('english', 'gujarati'):
+        with open(os.path.join(ROOT, f'faq_data_{language}.json'), 'r', encoding='utf-8') as f:
+            faq_data[language] = json.load(f)
+    return FaqAnswerEngine(faq_data)
+
+
+@pytest.mark.parametrize('question', [
+    "What is the maintenance cost?",
+    "stamp duty cost",
+    "registration cost",
+    "price of parking",
+    "What is the size of the kitchen?",
+    "balcony size of 4bhk",
+    "carpet area of the living room",
+    "What is in tower A?",
+    "What is the rera number?",
+])
+def test_other_subjects_go_to_gemini(engine, question):
+    assert engine.answer(question, 'english') is None
+
+
+def test_unit_fact_without_subject_goes_to_gemini(engine):
+    assert engine.answer("what is the price", 'english') is None
+    assert engine.answer("ભાવ શું છે", 'gujarati') is None
+
+
+def test_rera_number_in_gujarati_goes_to_gemini(engine):
+    assert engine.answer("રેરા નંબર શું છે", 'gujarati') is None
+
+
+@pytest.mark.parametrize('question, expected', [
+    ("price of 3bhk", "3BHK"),
+    ("carpet area of 4bhk", "4BHK"),
+    ("how many towers", "towers"),
+    ("is it rera registered", "RERA"),
+    ("when is possession", "Possession"),
+    ("number of flats", "units"),
+])
+def test_plain_facts_are_templated(engine, question, expected):
+    reply = engine.answer(question, 'english')
+    assert reply is not None and expected in reply
+
+
+@pytest.mark.parametrize('question, language', [
+    ("is the address of brookstone near airport", 'english'),
+    ("બ્રૂકસ્ટોનનું સરનામું અને નજીકની શાળા", 'gujarati'),
+    ("how many towers and units", 'english'),
+    ("price of 3bhk penthouse", 'english'),
+])
+def test_questions_asking_for_more_than_the_fact_go_to_gemini(engine, question, language):
+    assert engine.answer(question, language) is None
+
+
+def test_rate_question_gets_no_unit_size_block(engine):
+    reply = engine.answer("4bhk price per sqft", 'english')
+    assert reply is not None and "4BHK" in reply and "Unit size" not in reply
+
+
+def test_gujarati_digits_match_unit_types(engine):
+    reply = engine.answer("૩ બીએચકે ભાવ", 'gujarati')
+    assert reply is not None and "3BHK" in reply and "4BHK" not in reply
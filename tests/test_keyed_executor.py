@@ -0,0 +1,60 @@
+import threading
+import time
+
+from job_queue import JobQueue
+from keyed_executor import KeyedExecutor
+
+
+def test_jobs_for_one_sender_run_in_submission_order():
+    queue = JobQueue('test', workers=4, max_size=100)
+    executor = KeyedExecutor(queue, max_pending_per_key=100)
+    seen = []
+    for i in range(50):
+        # Later jobs are faster, so any overlap or reordering would show up
+        assert executor.submit('alice', lambda i=i: (time.sleep(0.001 * (i % 3 == 0)), seen.append(i)))
+    queue.join()
+    assert seen == list(range(50))
+
+
+def test_different_senders_run_in_parallel():
+    queue = JobQueue('test', workers=2, max_size=100)
+    executor = KeyedExecutor(queue)
+    # Each job waits for the other sender's job; this only completes if both run at once
+    barrier = threading.Barrier(2, timeout=5)
+    results = []
+    executor.submit('alice', lambda: results.append(barrier.wait()))
+    executor.submit('bob', lambda: results.append(barrier.wait()))
+    queue.join()
+    assert sorted(results) == [0, 1]
+
+
+def test_jobs_for_one_sender_never_overlap():
+    queue = JobQueue('test', workers=4, max_size=100)
+    executor = KeyedExecutor(queue, max_pending_per_key=100)
+    running = []
+    overlaps = []
+
+    def job():
+        running.append(1)
+        if len(running) > 1:
+            overlaps.append(1)
+        time.sleep(0.001)
+        running.pop()
+
+    for _ in range(20):
+        executor.submit('alice', job)
+    queue.join()
+    assert not overlaps
+
+
+def test_rejects_beyond_max_pending_per_key():
+    queue = JobQueue('test', workers=1, max_size=100)
+    executor = KeyedExecutor(queue, max_pending_per_key=2)
+    release = threading.Event()
+    assert executor.submit('alice', release.wait)
+    # The first job may already be running; fill the per-key queue either way
+    accepted = [executor.submit('alice', lambda: None) for _ in range(3)]
+    assert accepted.count(False) >= 1
+    assert executor.stats()['rejected'] >= 1
+    release.set()
+    queue.join()
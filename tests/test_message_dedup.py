@@ -0,0 +1,83 @@
+import pytest
+
+import message_dedup
+from message_dedup import BloomFilter, MessageDeduplicator
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(message_dedup.time, 'monotonic', clock)
+    return clock
+
+
+def test_exact_window_catches_redelivery_and_discard_lets_retry_through(clock):
+    dedup = MessageDeduplicator(exact_window_seconds=60, bloom_window_seconds=600, bloom_capacity=1000)
+    assert dedup.seen('wamid.1') is False
+    clock.now += 30
+    assert dedup.seen('wamid.1') is True
+    dedup.discard('wamid.1')
+    assert dedup.seen('wamid.1') is False
+    assert dedup.stats()['bloom_duplicates'] == 0
+
+
+def test_expired_ids_move_into_the_bloom_filter(clock):
+    dedup = MessageDeduplicator(exact_window_seconds=60, bloom_window_seconds=600, bloom_capacity=1000)
+    dedup.seen('wamid.1')
+    clock.now += 61
+    assert dedup.seen('wamid.1') is True
+    stats = dedup.stats()
+    assert stats['exact_entries'] == 0
+    assert stats['bloom_entries'] == 1
+    assert stats['bloom_duplicates'] == 1
+    # Only the exact window can be undone
+    dedup.discard('wamid.1')
+    assert dedup.seen('wamid.1') is True
+
+
+def test_overflowing_the_exact_window_spills_into_the_bloom_filter(clock):
+    dedup = MessageDeduplicator(exact_window_seconds=60, max_exact=2, bloom_window_seconds=600, bloom_capacity=1000)
+    for message_id in ('a', 'b', 'c'):
+        dedup.seen(message_id)
+    assert dedup.stats()['exact_entries'] == 2
+    assert dedup.seen('a') is True
+    assert dedup.stats()['bloom_duplicates'] == 1
+
+
+def test_ids_survive_one_bloom_rotation_and_drop_after_two(clock):
+    dedup = MessageDeduplicator(exact_window_seconds=60, bloom_window_seconds=600, bloom_capacity=1000)
+    dedup.seen('wamid.1')
+    clock.now += 61
+    dedup.seen('other')  # ages wamid.1 into the current generation
+
+    clock.now += 600
+    assert dedup.seen('wamid.1') is True  # now in the previous generation
+
+    clock.now += 600
+    assert dedup.seen('wamid.1') is False  # both generations rotated out
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 1e-6)
+    items = [f'wamid.{i}' for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    assert sum(f'other.{i}' in bloom for i in range(1000)) == 0
+
+
+def test_stats_report_bloom_memory_for_both_generations(clock):
+    dedup = MessageDeduplicator(bloom_window_seconds=600, bloom_capacity=200000)
+    one_generation = dedup.stats()['bloom_bytes']
+    assert 700_000 < one_generation < 740_000
+    clock.now += 600
+    dedup.seen('wamid.1')
+    assert dedup.stats()['bloom_bytes'] == 2 * one_generation
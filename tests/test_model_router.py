@@ -0,0 +1,29 @@
+from model_router import ModelRouter, ModelTier
+
+
+def make_router():
+    return ModelRouter([ModelTier('fast', 'fast-model', 400), ModelTier('full', 'full-model', 800)])
+
+
+def test_short_first_message_goes_to_fast_tier():
+    router = make_router()
+    for question in ("hi", "gym timings?", "Is there parking?"):
+        assert router.classify(question, [], 3000, prior_bot_turns=0) == 'fast'
+
+
+def test_short_follow_up_after_bot_reply_goes_to_full_tier():
+    router = make_router()
+    assert router.classify("yes", [], 3000, prior_bot_turns=1) == 'full'
+
+
+def test_comparison_goes_to_full_tier():
+    router = make_router()
+    assert router.classify("compare 3bhk and 4bhk", [], 3000) == 'full'
+
+
+def test_open_breaker_falls_back_to_other_tier():
+    router = make_router()
+    fast = router.tiers['fast']
+    for _ in range(fast.breaker.failure_threshold):
+        fast.record(10, ok=False)
+    assert router.select('fast').name == 'full'
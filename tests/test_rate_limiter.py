@@ -0,0 +1,89 @@
+import pytest
+
+import rate_limiter
+from rate_limiter import OutboundLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(rate_limiter.time, 'sleep', clock.sleep)
+    return clock
+
+
+def test_bucket_allows_a_burst_then_refills_at_the_rate(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    assert [bucket.try_take() for _ in range(4)] == [True, True, True, False]
+    clock.now += 0.5
+    assert bucket.try_take() is True
+    assert bucket.try_take() is False
+    # Refill never goes above the burst
+    clock.now += 60
+    assert [bucket.try_take() for _ in range(4)] == [True, True, True, False]
+
+
+def test_reserve_goes_into_debt_and_reports_the_wait(clock):
+    bucket = TokenBucket(rate=2, burst=1)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+    bucket.release()
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_block_for_holds_reservations_back(clock):
+    bucket = TokenBucket(rate=10, burst=10)
+    bucket.block_for(5)
+    assert bucket.try_take() is False
+    assert bucket.reserve() == pytest.approx(5)
+    clock.now += 5
+    assert bucket.try_take() is True
+
+
+def test_pair_limit_paces_one_recipient_after_its_burst(clock):
+    limiter = OutboundLimiter(rate_per_second=80, burst=80, pair_rate_per_second=1 / 6, pair_burst=2)
+    assert limiter.acquire('+911') == 0.0
+    assert limiter.acquire('+911') == 0.0
+    assert limiter.acquire('+911') == pytest.approx(6)
+    assert clock.slept == [pytest.approx(6)]
+    # Other recipients are not held back by the first one's pair limit
+    assert limiter.acquire('+912') == 0.0
+    assert limiter.stats()['delayed'] == 1
+
+
+def test_acquire_gives_up_without_sleeping_past_max_wait(clock):
+    limiter = OutboundLimiter(pair_rate_per_second=1 / 6, pair_burst=1)
+    limiter.acquire('+911')
+    assert limiter.acquire('+911', max_wait=1) is None
+    assert clock.slept == []
+    assert limiter.stats()['rejected'] == 1
+    # The reservation was given back, so the next wait is still one interval
+    assert limiter.acquire('+911', max_wait=10) == pytest.approx(6)
+
+
+def test_read_receipts_only_use_the_global_bucket(clock):
+    limiter = OutboundLimiter(rate_per_second=1, burst=1, pair_burst=1)
+    assert limiter.acquire() == 0.0
+    assert limiter.acquire(max_wait=0) is None
+    assert limiter.stats()['recipients'] == 0
+
+
+def test_least_recently_used_recipients_are_dropped(clock):
+    limiter = OutboundLimiter(max_recipients=2)
+    for recipient in ('+911', '+912', '+911', '+913'):
+        limiter.acquire(recipient)
+    assert list(limiter._recipients) == ['+911', '+913']
@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_followers_share_the_leader_result():
+    flights = SingleFlight(timeout=5)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'answer'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do('q', slow)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flights.do('q', slow))) for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    # Give the followers time to attach to the in-flight call before it finishes
+    time.sleep(0.2)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert results == ['answer'] * 4
+    assert len(calls) == 1
+    assert flights.stats()['leaders'] == 1
+    assert flights.stats()['coalesced'] == 3
+
+
+def test_leader_error_propagates_and_followers_retry_themselves():
+    flights = SingleFlight(timeout=5)
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError('gemini down')
+
+    errors = []
+
+    def lead():
+        try:
+            flights.do('q', failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    started.wait(5)
+    follower_result = []
+    follower = threading.Thread(target=lambda: follower_result.append(flights.do('q', lambda: 'own call')))
+    follower.start()
+    time.sleep(0.2)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert errors == ['gemini down']
+    assert follower_result == ['own call']
+
+
+def test_calls_after_completion_run_again():
+    flights = SingleFlight()
+    calls = []
+    assert flights.do('q', lambda: calls.append(1) or len(calls)) == 1
+    assert flights.do('q', lambda: calls.append(1) or len(calls)) == 2
+    with pytest.raises(ValueError):
+        flights.do('q', lambda: (_ for _ in ()).throw(ValueError('bad')))
+    assert flights.stats()['in_flight'] == 0
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from warm_cache import generate_entries, load_warm_file, write_warm_file
+from gemini_answers import create_answer_service
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def answers(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    monkeypatch.delenv('GEMINI_API_KEY', raising=False)
+    return create_answer_service()
+
+
+def test_warm_job_does_not_import_the_bot():
+    code = "import sys, warm_cache; print('whatsapp_bot' in sys.modules, 'flask' in sys.modules)"
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert output.split() == ['False', 'False']
+
+
+def test_warm_answers_are_served_from_the_live_answer_path(answers, tmp_path):
+    question = 'What amenities are available?'
+    entries, attempted = generate_entries(answers, {'english': [question]}, stub=True)
+    assert attempted == 1
+    path = str(tmp_path / 'warm.json')
+    write_warm_file(path, answers.faq_version, entries)
+
+    live = create_answer_service()
+    assert load_warm_file(live.cache, path, live.faq_version, ttl_seconds=0) == 1
+    reply = live.generate_answer(question, 'english', [(question, True)], live.router.match(question.lower()))
+    assert reply == f'[stub] {question}'
+    assert live.cache.stats()['hits'] == 1
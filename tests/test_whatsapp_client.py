@@ -0,0 +1,44 @@
+import pytest
+
+from deadline import Deadline
+from rate_limiter import OutboundLimiter, RateLimitTimeout
+from whatsapp_client import WhatsAppClient
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def json(self):
+        return {}
+
+
+class FakeSession:
+    def __init__(self):
+        self.posts = []
+
+    def post(self, url, json, timeout):
+        self.posts.append(json)
+        return FakeResponse()
+
+
+def make_client(limiter=None):
+    client = WhatsAppClient('token', '123', limiter=limiter or OutboundLimiter())
+    client.session = FakeSession()
+    return client
+
+
+def test_reply_past_deadline_is_still_sent():
+    client = make_client()
+    response = client.send_text('919999999999', 'hello', timeout=1, deadline=Deadline(0.0))
+    assert response.status_code == 200
+    assert len(client.session.posts) == 1
+
+
+def test_read_receipt_does_not_wait_past_deadline():
+    # One token and a very slow refill: the second read would have to wait ~100 s
+    client = make_client(OutboundLimiter(rate_per_second=0.01, burst=1))
+    client.mark_read('wamid.1', timeout=1)
+    with pytest.raises(RateLimitTimeout):
+        client.mark_read('wamid.2', timeout=1, deadline=Deadline(0.0))
+    assert len(client.session.posts) == 1
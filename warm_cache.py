@@ -0,0 +1,125 @@
+"""Pre-generate Gemini answers for canonical questions and write a warm answer-cache file
+
+Run after a deploy or FAQ edit:
+
+    python warm_cache.py --questions warm_questions.json --output answer_cache_warm.json
+
+The file is tagged with the FAQ content hash; the bot loads it at startup
+(ANSWER_CACHE_WARM_FILE) only when that hash matches its own FAQ data.
+Loaded answers expire after ANSWER_CACHE_WARM_TTL seconds (default 0: kept
+until the FAQ changes or live traffic evicts them from the LRU), not after
+the regular ANSWER_CACHE_TTL.
+Use --stub to exercise the pipeline without calling Gemini.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from gemini_answers import create_answer_service, GEMINI_ERROR_REPLY, GEMINI_NOT_CONFIGURED_REPLY
+
+WARM_FILE_FORMAT = 1
+
+
+def write_warm_file(path, faq_version, entries, stub=False):
+    """Atomically write warm cache entries [{key, language, question, answer}]"""
+    document = {
+        'format': WARM_FILE_FORMAT,
+        'faq_version': faq_version,
+        'stub': stub,
+        'created_at': time.time(),
+        'entries': entries
+    }
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def load_warm_file(cache, path, faq_version, ttl_seconds=None):
+    """Put the answers from a warm cache file into cache with ttl_seconds (None = the cache TTL); returns how many were loaded"""
+    if not path or not os.path.exists(path):
+        return 0
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            document = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.error(f"Error reading warm answer cache {path}: {e}")
+        return 0
+    if document.get('format') != WARM_FILE_FORMAT or document.get('faq_version') != faq_version:
+        logging.warning(f"⚠️ Warm answer cache {path} was built for FAQ version "
+                        f"{document.get('faq_version')}, current is {faq_version}; not loaded")
+        return 0
+    if document.get('stub'):
+        logging.warning(f"⚠️ Warm answer cache {path} holds stub answers; not loaded")
+        return 0
+    entries = document.get('entries', [])
+    for entry in entries:
+        cache.put(entry['key'], entry['answer'], ttl_seconds=ttl_seconds)
+    return len(entries)
+
+
+def generate_entries(answers, questions, concurrency=4, stub=False):
+    """Build prompts and pick models exactly like the bot does and generate answers with bounded concurrency"""
+    jobs = []
+    for language, language_questions in questions.items():
+        for question in language_questions:
+            # Templated questions never reach the cache, so there is nothing to warm
+            if answers.templates.answer(question, language) is not None:
+                continue
+            intents = answers.router.match(question.lower().strip())
+            relevant_data = answers.extract_relevant_data(question, language, intents)
+            key = answers.cache.make_key(question, language, relevant_data.keys())
+            jobs.append((key, language, question, intents, relevant_data))
+
+    def generate(job):
+        key, language, question, intents, relevant_data = job
+        if stub:
+            answer = f"[stub] {question}"
+        else:
+            prompt = answers.create_prompt(question, language, None, relevant_data)
+            # Same model tier and thinking budget as a live first message, so warm answers match live ones
+            tier, thinking_budget = answers.select_route(question, intents, prompt)
+            answer = answers.call_gemini(prompt, language, None, tier, thinking_budget)
+        if answer in (GEMINI_ERROR_REPLY, GEMINI_NOT_CONFIGURED_REPLY):
+            logging.error(f"❌ No answer generated for: {question}")
+            return None
+        return {'key': key, 'language': language, 'question': question, 'answer': answer}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(generate, jobs))
+    return [entry for entry in results if entry is not None], len(jobs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate answers for canonical questions into a warm cache file")
+    parser.add_argument('--questions', default='warm_questions.json',
+                        help="JSON file mapping language to a list of questions")
+    parser.add_argument('--output', default='answer_cache_warm.json', help="Warm cache file to write")
+    parser.add_argument('--concurrency', type=int, default=4, help="Parallel Gemini calls")
+    parser.add_argument('--stub', action='store_true', help="Use placeholder answers instead of calling Gemini")
+    args = parser.parse_args(argv)
+
+    with open(args.questions, 'r', encoding='utf-8') as f:
+        questions = json.load(f)
+
+    # Same factory and environment as the bot, so prompts, routing and cache keys match its own
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    answers = create_answer_service()
+
+    started = time.monotonic()
+    entries, attempted = generate_entries(answers, questions, args.concurrency, args.stub)
+    write_warm_file(args.output, answers.faq_version, entries, stub=args.stub)
+    print(f"Wrote {len(entries)}/{attempted} answers for FAQ version {answers.faq_version} to {args.output} "
+          f"in {time.monotonic() - started:.1f}s")
+    return 0 if len(entries) == attempted else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import time
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import LatencyTracker
+from rate_limiter import TokenBucket, OutboundLimiter, RateLimitTimeout, backoff_delay
+
+# Graph API error codes that mean "slow down" rather than "this request is wrong"
+THROTTLING_ERROR_CODES = {4, 80007, 130429, 131048, 131056}
+PAIR_RATE_LIMIT_ERROR_CODE = 131056
+
+
+class WhatsAppClient:
+    """Shared WhatsApp Cloud API client with a pooled keep-alive session
+
+    One client is created per process and reused by every worker thread, so
+    read receipts and replies reuse open TLS connections to graph.facebook.com
+    instead of paying a fresh handshake per request.
+
+    Every call first takes a token from the shared OutboundLimiter. A read
+    receipt whose deadline runs out before a token is free raises
+    RateLimitTimeout instead of waiting; replies and documents wait at least
+    `min_send_wait` seconds (one pair-rate interval) even past the deadline.
+    Throttled responses (HTTP 429 or a Graph throttling error code) are
+    retried after Retry-After or a jittered exponential backoff, at most
+    `max_retries` times per call and only while the client-wide retry budget
+    has tokens left.
+    """
+
+    def __init__(self, token, phone_number_id, pool_size=8, api_version='v23.0', limiter=None,
+                 max_retries=3, retry_budget_per_second=1.0, retry_burst=10, min_send_wait=6.0):
+        self.messages_url = f"https://graph.facebook.com/{api_version}/{phone_number_id}/messages"
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.latency = {}
+        self.limiter = limiter or OutboundLimiter()
+        self.max_retries = max_retries
+        self.min_send_wait = min_send_wait
+        self.retry_budget = TokenBucket(retry_budget_per_second, retry_burst)
+        self._stats_lock = threading.Lock()
+        self.throttled = 0
+        self.retries = 0
+        self.retries_exhausted = 0
+
+    def post_message(self, payload, kind, timeout=15, deadline=None):
+        """POST a payload within the rate limits, retrying throttled responses while the deadline allows"""
+        recipient = payload.get('to')
+        attempt = 0
+        while True:
+            # Read receipts never wait past the deadline; replies still go out late, after a bounded wait
+            max_wait = None
+            if deadline is not None:
+                max_wait = max(0.0 if kind == 'read' else self.min_send_wait, deadline.remaining())
+            if self.limiter.acquire(recipient, max_wait=max_wait) is None:
+                raise RateLimitTimeout(f"{kind} call to {recipient} would wait past its deadline for a rate limit slot")
+            if attempt and deadline is not None:
+                # Retries only get what is left of the message's budget
+                timeout = deadline.timeout(timeout, floor=1)
+            response = self._post(payload, kind, timeout)
+            error_code = self._throttling_error(response)
+            if error_code is None:
+                return response
+
+            with self._stats_lock:
+                self.throttled += 1
+            retry_after = response.headers.get('Retry-After')
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else backoff_delay(attempt)
+            # Pair limits only concern this recipient; anything else slows the whole number down
+            self.limiter.throttled(delay, recipient if error_code == PAIR_RATE_LIMIT_ERROR_CODE else None)
+            out_of_time = deadline is not None and not deadline.allows(delay + 1)
+            if attempt >= self.max_retries or out_of_time or not self.retry_budget.try_take():
+                with self._stats_lock:
+                    self.retries_exhausted += 1
+                logging.error(f"❌ Graph API {kind} call throttled (code {error_code}), giving up after {attempt + 1} attempts")
+                return response
+            attempt += 1
+            with self._stats_lock:
+                self.retries += 1
+            logging.warning(f"⏳ Graph API {kind} call throttled (code {error_code}), retry {attempt} in {delay:.1f}s")
+
+    @staticmethod
+    def _throttling_error(response):
+        """Return the throttling error code of a response, or None if it was not throttled"""
+        if response.status_code < 400:
+            return None
+        try:
+            code = response.json().get('error', {}).get('code')
+        except ValueError:
+            code = None
+        if code in THROTTLING_ERROR_CODES:
+            return code
+        return response.status_code if response.status_code == 429 else None
+
+    def _post(self, payload, kind, timeout):
+        started = time.monotonic()
+        try:
+            return self.session.post(self.messages_url, json=payload, timeout=timeout)
+        finally:
+            elapsed_ms = (time.monotonic() - started) * 1000
+            tracker = self.latency.get(kind)
+            if tracker is None:
+                tracker = self.latency.setdefault(kind, LatencyTracker())
+            tracker.record(elapsed_ms)
+            logging.debug(f"Graph API {kind} call took {elapsed_ms:.0f} ms")
+
+    def send_text(self, to_phone, message, timeout=15, deadline=None):
+        """Send a text message"""
+        payload = {
+            "messaging_product": "whatsapp",
+            "to": to_phone,
+            "type": "text",
+            "text": {"body": message}
+        }
+        return self.post_message(payload, 'text', timeout=timeout, deadline=deadline)
+
+    def send_document(self, to_phone, document_id, caption, filename="Brookstone.pdf", timeout=15, deadline=None):
+        """Send a previously uploaded media document"""
+        payload = {
+            "messaging_product": "whatsapp",
+            "to": to_phone,
+            "type": "document",
+            "document": {
+                "id": document_id,
+                "caption": caption,
+                "filename": filename
+            }
+        }
+        return self.post_message(payload, 'document', timeout=timeout, deadline=deadline)
+
+    def mark_read(self, message_id, timeout=10, deadline=None):
+        """Send a read receipt for an incoming message"""
+        payload = {
+            "messaging_product": "whatsapp",
+            "status": "read",
+            "message_id": message_id
+        }
+        return self.post_message(payload, 'read', timeout=timeout, deadline=deadline)
+
+    def stats(self):
+        """Return per-call-type latency plus rate limiting and retry counters"""
+        stats = {kind: tracker.snapshot() for kind, tracker in list(self.latency.items())}
+        stats['rate_limit'] = self.limiter.stats()
+        with self._stats_lock:
+            stats['throttled'] = self.throttled
+            stats['retries'] = self.retries
+            stats['retries_exhausted'] = self.retries_exhausted
+        return stats